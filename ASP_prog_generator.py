@@ -1,56 +1,141 @@
 import configparser
 import classifier
+import dataset
+import feature_reducer
+import solver
 
 
-def create_asp_prog(input_file, config_file_name):
+# read gate types from constraint file
+def read_gate_types(config_file):
+
+    """
+    Function to read gate types ([GATE SPECIFICATION] section of constraint file).
+
+    Parameters
+    ----------
+    config_file : ConfigParser
+        parsed constraint file
+
+    Returns
+    -------
+    list
+        description of allowed gates (see classifier.csv2asp)
+
+    """
+
+    GateTypes = []
+    for x in [1, 2]:
+        GateTypes.append({
+            "LowerBoundPos": int(config_file['GATE SPECIFICATION']['GateType%i_LowerBoundPos' % x]),
+            "LowerBoundNeg": int(config_file['GATE SPECIFICATION']['GateType%i_LowerBoundNeg' % x]),
+            "UpperBoundPos": int(config_file['GATE SPECIFICATION']['GateType%i_UpperBoundPos' % x]),
+            "UpperBoundNeg": int(config_file['GATE SPECIFICATION']['GateType%i_UpperBoundNeg' % x]),
+            "UpperBoundOcc": int(config_file['GATE SPECIFICATION']['GateType%i_UpperBoundOcc' % x]),
+        })
+
+    return GateTypes
+
+
+# check whether complementary features may be merged
+def complements_mergeable(config_file_name):
+
+    """
+    Function to check whether complementary features may be merged under the constraints
+    (see feature_reducer.sign_swaps_allowed).
+
+    Parameters
+    ----------
+    config_file_name : str
+        name of constraint file
+
+    Returns
+    -------
+    bool
+        True if complementary features may be merged
+
+    """
+
+    config_file = configparser.ConfigParser()
+    config_file.read(config_file_name)
+
+    return feature_reducer.sign_swaps_allowed(read_gate_types(config_file),
+                                              int(config_file['CLASSIFIER CONSTRAINTS']['UpperBoundInputs']))
+
+
+# check whether features may be reduced
+def features_reducible(config_file_name):
+
+    """
+    Function to check whether constant features may be removed and identical features merged under
+    the constraints (see feature_reducer.reduction_allowed).
+
+    Parameters
+    ----------
+    config_file_name : str
+        name of constraint file
+
+    Returns
+    -------
+    bool
+        True if features may be reduced
+
+    """
+
+    config_file = configparser.ConfigParser()
+    config_file.read(config_file_name)
+
+    constraints = config_file['CLASSIFIER CONSTRAINTS']
+    return feature_reducer.reduction_allowed(read_gate_types(config_file), int(constraints['LowerBoundInputs']),
+                                             int(constraints['LowerBoundGates']),
+                                             config_file.getboolean('CLASSIFIER CONSTRAINTS', 'UniquenessConstraint'),
+                                             int(config_file['OPTIMIZATION']['OptimizationStrategy']))
+
+
+def create_asp_prog(input_file, config_file_name, cache_dir=None, data_facts=True, deduplicate_samples=False,
+                    data_encoding="dense", prune_dominated=False):
 
     """
     Function to create ASP program.
 
     Parameters
     ----------
-    input_file : str
-        name of input train data file
+    input_file : str or Dataset
+        name of input train data file or loaded train data set
     config_file_name : str
         name of constraint file
+    cache_dir : str
+        directory of the on-disk cache of parsed data sets (None - no cache)
+    data_facts : bool
+        if False tissue and miRNA data are not added to the instance (they are added through the solver backend)
+    deduplicate_samples : bool
+        if True samples with identical profiles and annotations are merged (errors are counted as weighted sums)
+    data_encoding : str
+        values of miRNA data written as facts: dense (all), high (high only) or minority (less frequent value)
+    prune_dominated : bool
+        if True inputs dominated by other inputs of the same sign are not candidates for gate inputs
 
     Returns
     -------
-    instance : str
-        ASP instance
+    instance : ProgramFile
+        .asp file containing the ASP instance and the ASP program (read by the solver, see solver.ProgramFile)
     program : str
-        ASP program
+        ASP program (empty, the program is contained in the .asp file)
 
     """
 
     config_file = configparser.ConfigParser()
     config_file.read(config_file_name)
 
-    FnameCSV = input_file
-    FnameASP = input_file.replace(".csv", ".asp")
+    data = dataset.load_dataset(input_file, cache_dir)
 
-    GateTypes = []
+    FnameCSV = data.path
+    FnameASP = FnameCSV.replace(".csv", ".asp")
 
-    GateType1 = {
-        "LowerBoundPos": int(config_file['GATE SPECIFICATION']['GateType1_LowerBoundPos']),
-        "LowerBoundNeg": int(config_file['GATE SPECIFICATION']['GateType1_LowerBoundNeg']),
-        "UpperBoundPos": int(config_file['GATE SPECIFICATION']['GateType1_UpperBoundPos']),
-        "UpperBoundNeg": int(config_file['GATE SPECIFICATION']['GateType1_UpperBoundNeg']),
-        "UpperBoundOcc": int(config_file['GATE SPECIFICATION']['GateType1_UpperBoundOcc']),
-    }
-
-    GateType2 = {
-        "LowerBoundPos": int(config_file['GATE SPECIFICATION']['GateType2_LowerBoundPos']),
-        "LowerBoundNeg": int(config_file['GATE SPECIFICATION']['GateType2_LowerBoundNeg']),
-        "UpperBoundPos": int(config_file['GATE SPECIFICATION']['GateType2_UpperBoundPos']),
-        "UpperBoundNeg": int(config_file['GATE SPECIFICATION']['GateType2_UpperBoundNeg']),
-        "UpperBoundOcc": int(config_file['GATE SPECIFICATION']['GateType2_UpperBoundOcc']),
-    }
-
-    GateTypes = [GateType1, GateType2]
-
-    instance, program = \
-        classifier.csv2asp(fname_csv=FnameCSV,
+    GateTypes = read_gate_types(config_file)
+
+    # instance and program are written to the .asp file as they are generated and the solver reads the file
+    with open(FnameASP, 'w') as asp_file:
+        classifier.csv2asp(fname_csv=data,
                            fname_asp=FnameASP,
                            lower_bound_inputs=int(config_file['CLASSIFIER CONSTRAINTS']['LowerBoundInputs']),
                            upper_bound_inputs=int(config_file['CLASSIFIER CONSTRAINTS']['UpperBoundInputs']),
@@ -66,10 +151,71 @@ def create_asp_prog(input_file, config_file_name):
                            perfect_classifier=config_file.getboolean('ERROR CONSTRAINTS', 'PerfectClassifier'),
                            add_bounds_on_errors=config_file.getboolean('ERROR CONSTRAINTS', 'AddBoundsOnErrors'),
                            upper_bound_false_pos=int(config_file['ERROR CONSTRAINTS']['UpperBoundFalsePos']),
-                           upper_bound_false_neg=int(config_file['ERROR CONSTRAINTS']['UpperBoundFalseNeg']))
-
-    instance = "\n".join(instance)
-    program = "\n".join(program)
+                           upper_bound_false_neg=int(config_file['ERROR CONSTRAINTS']['UpperBoundFalseNeg']),
+                           data_facts=data_facts,
+                           deduplicate_samples=deduplicate_samples,
+                           data_encoding=data_encoding,
+                           prune_dominated=prune_dominated,
+                           order_gates=config_file.getboolean('OPTIONAL', 'OrderGates', fallback=False),
+                           project_classifiers=config_file.getboolean('OPTIONAL', 'ProjectClassifiers',
+                                                                      fallback=False),
+                           stream=asp_file)
+
+    instance = solver.ProgramFile(FnameASP)
+    program = ""  # the program is a part of the file
 
     return instance, program
 
+
+# read solver settings from constraint file
+def read_solver_settings(config_file_name, threads=None, parallel_mode=None, configuration=None, time_limit=None,
+                         model_limit=None):
+
+    """
+    Function to read solver settings ([SOLVER] section of constraint file, missing settings have default values).
+    Given parameters override values of the constraint file. Models are projected on classifiers without gate ids
+    if ProjectClassifiers of the [OPTIONAL] section is True (see classifier.csv2asp).
+
+    Parameters
+    ----------
+    config_file_name : str
+        name of constraint file
+    threads : int
+        number of solver threads
+    parallel_mode : str
+        parallel mode of solver threads (compete or split)
+    configuration : str
+        clasp configuration preset
+    time_limit : float
+        max time of a single solver call in seconds (0 - no limit)
+    model_limit : int
+        max number of optimal models returned by a single solver call (0 - all)
+
+    Returns
+    -------
+    SolverSettings
+        solver settings
+
+    """
+
+    config_file = configparser.ConfigParser()
+    config_file.read(config_file_name)
+
+    section = config_file['SOLVER'] if config_file.has_section('SOLVER') else {}
+
+    if threads is None:
+        threads = int(section.get('Threads', 1))
+    if parallel_mode is None:
+        parallel_mode = section.get('ParallelMode', 'compete').strip()
+    if configuration is None:
+        configuration = section.get('Configuration', '').strip() or None
+    if time_limit is None:
+        time_limit = float(section.get('TimeLimit', 0))
+    if model_limit is None:
+        model_limit = int(section.get('ModelLimit', 0))
+
+    project = config_file.getboolean('OPTIONAL', 'ProjectClassifiers', fallback=False)
+
+    return solver.SolverSettings(threads=threads, parallel_mode=parallel_mode, configuration=configuration,
+                                 time_limit=time_limit if time_limit > 0 else None, model_limit=model_limit,
+                                 project=project)
@@ -1,5 +1,10 @@
 # -*- coding: utf-8 -*-
 import csv
+import io
+import numpy
+import dataset
+import feature_reducer
+import packed_evaluator
 
 
 def csv2rows(FnameCSV):
@@ -47,6 +52,236 @@ def csv2rows(FnameCSV):
     return miRNAs, rows
 
 
+# class for writing ASP facts
+class FactWriter:
+
+    """
+
+    Class writing ASP facts to a stream (a file or any object with a write method). Facts are packed
+    into lines of about line_length characters. Length of the current line is counted while facts are added,
+    so packing takes linear time in the number of facts.
+
+    Attributes
+    ----------
+    stream : file
+        output stream
+    line_length : int
+        line is finished when its facts are longer than line_length characters
+    pending : list
+        facts of the current line
+    length : int
+        length of facts of the current line
+
+    Methods
+    -------
+    write_line(line)
+        Writes a single line.
+    write_facts(facts)
+        Adds facts to the current line.
+    end_block()
+        Finishes the current line.
+    """
+
+    def __init__(self, stream, line_length=100):
+        self.stream = stream  # output stream
+        self.line_length = line_length  # max length of facts in a line
+        self.pending = []  # facts of current line
+        self.length = 0  # length of facts of current line
+
+    def write_line(self, line):
+
+        """
+
+        Writes a single line.
+
+        Parameters
+        ----------
+        line : str
+            line
+
+        """
+
+        self.stream.write(line + "\n")
+
+    def write_facts(self, facts):
+
+        """
+
+        Adds facts to the current line. A line is written when its facts are longer than line_length.
+
+        Parameters
+        ----------
+        facts : iterable
+            facts
+
+        """
+
+        pending = self.pending
+        length = self.length
+        for fact in facts:
+            pending.append(fact)
+            length += len(fact)
+            if length > self.line_length:
+                self.stream.write(" ".join(pending) + "\n")
+                pending.clear()
+                length = 0
+
+        self.length = length
+
+    def end_block(self):
+
+        """
+
+        Writes the current line (possibly empty) and starts a new one.
+
+        """
+
+        self.stream.write(" ".join(self.pending) + "\n")
+        self.pending.clear()
+        self.length = 0
+
+
+# data encodings
+DATA_ENCODINGS = ["dense", "high", "minority"]
+
+
+# choose values of miRNA data written as facts
+def stored_values(data, data_encoding="dense"):
+
+    """
+
+    Chooses for each feature the value written as data/3 facts. The other value is derived through default
+    negation (see csv2asp).
+
+    Parameters
+    ----------
+    data : Dataset
+        data set
+    data_encoding : str
+        - dense: both values are written
+        - high: only high values are written
+        - minority: only the less frequent value of each feature is written
+
+    Returns
+    -------
+    numpy.ndarray
+        for each feature True if high values are written, False if low values are written
+        (None if both values are written)
+
+    """
+
+    if data_encoding not in DATA_ENCODINGS:
+        raise ValueError("Unknown data encoding: %s" % data_encoding)
+
+    if data_encoding == "dense":
+        return None
+
+    if data_encoding == "high":
+        return numpy.ones(len(data.features), dtype=bool)
+
+    # number of high values of each feature
+    high_counts = data.matrix.sum(axis=0, dtype=numpy.int64)
+
+    return 2 * high_counts <= len(data.ids)
+
+
+# compute feasible inputs (EfficiencyConstraint)
+def feasible_inputs(data):
+
+    """
+
+    Computes features that may be used as inputs of gates if EfficiencyConstraint=True. A feature may be
+    a positive input if it is high in at least one cancer sample and a negative input if it is low in at least
+    one cancer sample.
+
+    Parameters
+    ----------
+    data : Dataset
+        data set
+
+    Returns
+    -------
+    feasible_pos : numpy.ndarray
+        for each feature True if it may be a positive input
+    feasible_neg : numpy.ndarray
+        for each feature True if it may be a negative input
+
+    """
+
+    cancer = data.matrix[data.annots != 0]  # samples annotated as cancer in the instance
+
+    feasible_pos = (cancer == 1).any(axis=0)
+    feasible_neg = (cancer == 0).any(axis=0)
+
+    return feasible_pos, feasible_neg
+
+
+# write tissue and miRNA data as ASP facts
+def write_data_facts(writer, data, data_encoding="dense", needed=None):
+
+    """
+
+    Writes tissue and miRNA data of a data set as ASP facts.
+
+    Parameters
+    ----------
+    writer : FactWriter
+        fact writer
+    data : Dataset
+        data set
+    data_encoding : str
+        values of miRNA data written as facts (see stored_values)
+    needed : tuple
+        if given, (low, high) arrays, for each feature True if its low (high) values are needed
+        by the program, other values are not written
+
+    """
+
+    writer.write_line('%%% The tissue data')
+    writer.write_facts("tissue(%s,%s)." % (sample_id, "healthy" if annot == 0 else "cancer")
+                       for sample_id, annot in zip(data.ids, data.annots.tolist()))
+    writer.end_block()
+
+    if data.weights is not None:  # number of merged samples
+        writer.write_line('')
+        writer.write_line('%%% The tissue weights')
+        writer.write_facts("tissue_weight(%s,%i)." % (sample_id, weight)
+                           for sample_id, weight in zip(data.ids, data.weights.tolist()))
+        writer.end_block()
+
+    writer.write_line('')
+    writer.write_line('%%% The miRNA data')
+    suffixes = [(",%s,low)." % miRNA, ",%s,high)." % miRNA) for miRNA in data.features]  # facts end by value
+    stored = stored_values(data, data_encoding)
+    if stored is None and needed is None:
+        for sample_id, values in zip(data.ids, data.matrix.tolist()):
+            prefix = "data(" + sample_id
+            writer.write_facts(prefix + suffix[value == 1] for suffix, value in zip(suffixes, values))
+        writer.end_block()
+    elif stored is None:
+        need_low, need_high = needed
+        for sample_id, values in zip(data.ids, data.matrix):
+            prefix = "data(" + sample_id
+            written = numpy.flatnonzero(numpy.where(values == 1, need_high, need_low)).tolist()  # needed values
+            values = values.tolist()
+            writer.write_facts(prefix + suffixes[i][values[i]] for i in written)
+        writer.end_block()
+    else:
+        if needed is not None:  # both values are derived from stored values
+            stored_needed = needed[0] | needed[1]
+        writer.write_facts("sparse_value(%s,%s)." % (miRNA, "high" if high else "low")
+                           for miRNA, high in zip(data.features, stored.tolist()))
+        writer.end_block()
+        suffixes = [suffix[high] for suffix, high in zip(suffixes, stored.tolist())]
+        for sample_id, values in zip(data.ids, data.matrix):
+            prefix = "data(" + sample_id
+            written = values == stored  # features with stored values in the sample
+            if needed is not None:
+                written &= stored_needed
+            writer.write_facts(prefix + suffixes[i] for i in numpy.flatnonzero(written).tolist())
+        writer.end_block()
+
+
 def csv2asp(fname_csv,
             fname_asp,
             lower_bound_inputs,
@@ -63,7 +298,14 @@ def csv2asp(fname_csv,
             perfect_classifier,
             add_bounds_on_errors,
             upper_bound_false_pos,
-            upper_bound_false_neg
+            upper_bound_false_neg,
+            data_facts=True,
+            deduplicate_samples=False,
+            data_encoding="dense",
+            prune_dominated=False,
+            order_gates=False,
+            project_classifiers=False,
+            stream=None
             ):
 
     """
@@ -72,8 +314,8 @@ def csv2asp(fname_csv,
 
     Parameters
     ----------
-    fname_csv : str
-        name of input file
+    fname_csv : str or Dataset
+        name of input file or loaded data set
     fname_asp : str
         name of output file
     lower_bound_inputs : int
@@ -111,13 +353,39 @@ def csv2asp(fname_csv,
         upper bound on false positive errors (needed if PerfectClassifier=False)
     upper_bound_false_neg : int
         upper bound on false negative errors (needed if PerfectClassifier=False)
+    data_facts : bool
+        if False tissue and miRNA data are not written (they are added through the solver backend,
+        see solver.add_data_facts)
+    deduplicate_samples : bool
+        if True samples with identical profiles and annotations are merged and errors are counted
+        as weighted sums (see dataset.Dataset.deduplicated)
+    data_encoding : str
+        - dense: data/3 facts are written for high and low values
+        - high: data/3 facts are written for high values only
+        - minority: data/3 facts are written for the less frequent value of each feature only
+        (values that are not written are derived through default negation, models do not change)
+    prune_dominated : bool
+        if True inputs dominated by other inputs of the same sign are removed from candidates for gate inputs
+        (see feature_reducer.undominated_inputs), at least one optimal solution is kept
+    order_gates : bool
+        if True gates of the same type are ordered lexicographically by their inputs (features in the order
+        of the data set), so permuted copies of classifiers are not enumerated
+    project_classifiers : bool
+        if True answers are projected on classifiers without gate ids (classifier_input/3), so each distinct
+        classifier is enumerated once (the solver must be called with --project)
+    stream : file
+        if given, the instance and the program are written to this text stream as they are generated
+        (e.g., an open .asp file or the standard input of gringo), they are not kept in memory, fname_asp
+        is not written (it names the file of the stream in messages) and None is returned
 
     Returns
     -------
-    miRNAs : list
-        names of features
-    rows : list
-        data
+    instance : str
+        ASP instance, i.e., data and constant constraints
+    program : str
+        ASP program
+
+    If fname_asp is None, a single string with the instance and the program is returned.
 
     """
 
@@ -130,6 +398,11 @@ def csv2asp(fname_csv,
                                      3: "minimize number of inputs",
                                      4: "minimize number of gates"}
 
+    data = dataset.load_dataset(fname_csv)
+    fname_csv = data.path
+    if deduplicate_samples and data.weights is None:
+        data = data.deduplicated()
+
     if not silent:
         print("####################################")
         print("####RNA CANCER CLASSIFIER OUTPUT####")
@@ -142,78 +415,145 @@ def csv2asp(fname_csv,
             print("Type ", i+1)
             [print(key, ": ", gate_types[i][key]) for key in gate_types[i].keys()]
         print("Efficiency constraints:", efficiency_constraint)
+        print("Gate ordering:", order_gates)
+        print("Projection on classifiers:", project_classifiers)
         print("Optimization strategy:", optimization_strategy, "(%s)"
               % optimization_strategy_mapping[optimization_strategy])
 
     assert(lower_bound_gates > 0)
     assert(lower_bound_inputs > 0)
+    if data_encoding not in DATA_ENCODINGS:
+        raise ValueError("Unknown data encoding: %s" % data_encoding)
 
-    miRNAs, rows = csv2rows(fname_csv)
+    miRNAs = data.features
 
     if not silent:
         print("miRNAs: ", len(miRNAs))
-        print("samples:", len(rows))
-
-    instance = ['']
-    instance += ['% ASP constraints for computing a miRNA cancer classifier']
-    instance += ['% that agrees with given tissue data and satisfies given structural constraints.']
-    instance += ['% note: A classifier is a Boolean expression in conjunctive form.']
-    instance += ['% the homepage of the project is https://github.com/hklarner/RnaCancerClassifier.']
-    instance += ['% written by K. Becker and H. Klarner, March 2016, FU Berlin.']
-    instance += ['']
-    instance += ['%% InputFile = %s' % fname_csv]
-    instance += ['%% Efficiency constraints: %s' % str(efficiency_constraint)]
-    instance += ['%% Optimization strategy: %i  (%s)'
-                 % (optimization_strategy, optimization_strategy_mapping[optimization_strategy])]
-    instance += ['']
-    instance += ['']
-
-    instance += ['%%% The tissue data']
-    dummy = []
-    for x in rows:
-        y = "healthy" if x["Annots"] == "0" else "cancer"
-        dummy.append("tissue(%s,%s)." % (x["ID"], y))
-        if sum(map(len, dummy)) > 100:
-            instance += [" ".join(dummy)]
-            dummy = []
-
-    instance += [" ".join(dummy)]
-    instance += [""]
-    instance += ['%%% The miRNA data']
-    dummy = []
-    for x in rows:
-        for miRNA in miRNAs:
-            y = "high" if x[miRNA] == "1" else "low"
-            dummy.append("data(%s,%s,%s)." % (x["ID"], miRNA, y))
-            if sum(map(len, dummy)) > 100:
-                instance += [" ".join(dummy)]
-                dummy = []
-
-    instance += [' '.join(dummy)]
-    instance += ['']
-    instance += ['']
-
-    instance += ["%%% User Input"]
-    instance += ['lower_bound_inputs(%i).' % lower_bound_inputs]
-    instance += ['upper_bound_inputs(%i).' % upper_bound_inputs]
-    instance += ['lower_bound_gates(%i).' % lower_bound_gates]
-    instance += ['upper_bound_gates(%i).' % upper_bound_gates]
-    instance += ['']
+        print("samples:", len(data.ids))
+        if data.weights is not None:
+            print("merged samples:", int(data.weights.sum()))
+
+    # facts are streamed to the given stream or to a single buffer instead of a list of lines
+    writer = FactWriter(io.StringIO() if stream is None else stream)
+
+    writer.write_line('')
+    writer.write_line('% ASP constraints for computing a miRNA cancer classifier')
+    writer.write_line('% that agrees with given tissue data and satisfies given structural constraints.')
+    writer.write_line('% note: A classifier is a Boolean expression in conjunctive form.')
+    writer.write_line('% the homepage of the project is https://github.com/hklarner/RnaCancerClassifier.')
+    writer.write_line('% written by K. Becker and H. Klarner, March 2016, FU Berlin.')
+    writer.write_line('')
+    writer.write_line('%% InputFile = %s' % fname_csv)
+    writer.write_line('%% Efficiency constraints: %s' % str(efficiency_constraint))
+    writer.write_line('%% Optimization strategy: %i  (%s)'
+                      % (optimization_strategy, optimization_strategy_mapping[optimization_strategy]))
+    writer.write_line('')
+    writer.write_line('')
+
+    candidate_inputs = efficiency_constraint  # candidates for gate inputs are given as facts
+    pruned = False  # dominated inputs were removed
+    feasible_pos, feasible_neg = None, None
+    if efficiency_constraint:  # feasible inputs are computed here instead of in the grounder
+        feasible_pos, feasible_neg = feasible_inputs(data)
+
+    if prune_dominated:
+        # replacing a dominated input by its dominating input may require removing inputs or gates
+        unsafe = []
+        if uniqueness_constraint:
+            unsafe.append("UniquenessConstraint=True")
+        if optimization_strategy == 0:
+            unsafe.append("no optimization")
+        if lower_bound_gates > 1 or lower_bound_inputs > 1 \
+                or any(gate_type["LowerBoundPos"] > 0 or gate_type["LowerBoundNeg"] > 0 for gate_type in gate_types):
+            unsafe.append("lower bounds on gates or inputs")
+        if any(gate_type["UpperBoundPos"] > 0 and gate_type["UpperBoundNeg"] > 0 for gate_type in gate_types):
+            # a gate holding a negative input of the dominating feature cannot take its positive input
+            unsafe.append("gate types with positive and negative inputs")
+
+        if unsafe:
+            print("Dominated inputs are not removed (%s)." % ", ".join(unsafe))
+        else:
+            domain = len(miRNAs) * 2 if feasible_pos is None else int(feasible_pos.sum() + feasible_neg.sum())
+            feasible_pos, feasible_neg = feature_reducer.undominated_inputs(data, feasible_pos, feasible_neg)
+            candidate_inputs = True
+            pruned = True
+            kept = int(feasible_pos.sum() + feasible_neg.sum())
+            print("Dominated inputs removed: ", domain - kept, "of", domain,
+                  "(%.1f%% of candidate inputs)" % (100.0 * (domain - kept) / max(domain, 1)))
+
+    needed = None
+    if candidate_inputs:
+        # values read by gates with feasible positive and negative inputs
+        if boolean_function_form == 0:
+            needed = (feasible_neg, feasible_pos)
+        else:
+            needed = (feasible_pos, feasible_neg)
+
+    if data_facts:
+        write_data_facts(writer, data, data_encoding, needed)
+    else:
+        writer.write_line('%%% The tissue and miRNA data are added through the solver backend')
+    writer.write_line('')
+    writer.write_line('')
+
+    if candidate_inputs:
+        writer.write_line('%%%%%% Feasible inputs (EfficiencyConstraint=%s, dominated inputs removed=%s)'
+                          % (str(efficiency_constraint), str(pruned)))
+        writer.write_facts("is_mirna(%s)." % miRNA
+                           for miRNA, candidate in zip(miRNAs, (feasible_pos | feasible_neg).tolist()) if candidate)
+        writer.end_block()
+        writer.write_facts("feasible_pos_miRNA(%s)." % miRNA
+                           for miRNA, feasible in zip(miRNAs, feasible_pos.tolist()) if feasible)
+        writer.end_block()
+        writer.write_facts("feasible_neg_miRNA(%s)." % miRNA
+                           for miRNA, feasible in zip(miRNAs, feasible_neg.tolist()) if feasible)
+        writer.end_block()
+        writer.write_line('')
+        writer.write_line('')
+
+    if order_gates or project_classifiers:
+        # successor relation of candidate miRNAs, gates are compared along it
+        ordered = miRNAs if not candidate_inputs \
+            else [miRNA for miRNA, candidate in zip(miRNAs, (feasible_pos | feasible_neg).tolist()) if candidate]
+        writer.write_line('%%%%%% Order of miRNAs (OrderGates=%s, ProjectClassifiers=%s)'
+                          % (str(order_gates), str(project_classifiers)))
+        if len(ordered) != 0:
+            writer.write_line('first_mirna(%s).' % ordered[0])
+        writer.write_facts("next_mirna(%s,%s)." % pair for pair in zip(ordered, ordered[1:]))
+        writer.end_block()
+        writer.write_line('')
+        writer.write_line('')
+
+    writer.write_line("%%% User Input")
+    writer.write_line('lower_bound_inputs(%i).' % lower_bound_inputs)
+    writer.write_line('upper_bound_inputs(%i).' % upper_bound_inputs)
+    writer.write_line('lower_bound_gates(%i).' % lower_bound_gates)
+    writer.write_line('upper_bound_gates(%i).' % upper_bound_gates)
 
     for x, gate_type in enumerate(gate_types):
-        instance += ["%% gate type %i."%(x+1)]
-        instance += ["is_gate_type(%i)."%(x+1)]
-        instance += ["upper_bound_pos_inputs(%i, %i)." % (x+1, gate_type["UpperBoundPos"])]
-        instance += ["upper_bound_neg_inputs(%i, %i)." % (x+1, gate_type["UpperBoundNeg"])]
-        instance += ["lower_bound_pos_inputs(%i, %i)." % (x+1, gate_type["LowerBoundPos"])]
-        instance += ["lower_bound_neg_inputs(%i, %i)." % (x+1, gate_type["LowerBoundNeg"])]
-        instance += ["upper_bound_gate_occurence(%i, %i)." % (x+1, gate_type["UpperBoundOcc"])]
-        instance += ['']
+        writer.write_line('')
+        writer.write_line("%% gate type %i." % (x+1))
+        writer.write_line("is_gate_type(%i)." % (x+1))
+        writer.write_line("upper_bound_pos_inputs(%i, %i)." % (x+1, gate_type["UpperBoundPos"]))
+        writer.write_line("upper_bound_neg_inputs(%i, %i)." % (x+1, gate_type["UpperBoundNeg"]))
+        writer.write_line("lower_bound_pos_inputs(%i, %i)." % (x+1, gate_type["LowerBoundPos"]))
+        writer.write_line("lower_bound_neg_inputs(%i, %i)." % (x+1, gate_type["LowerBoundNeg"]))
+        writer.write_line("upper_bound_gate_occurence(%i, %i)." % (x+1, gate_type["UpperBoundOcc"]))
+
+    instance = None
+    if stream is None:
+        instance = writer.stream.getvalue()
+        writer.stream.close()
 
     program = ['']
     program += ['% binding of variables']
     program += ["is_tissue_id(X) :- tissue(X,Y)."]
-    program += ["is_mirna(Y) :- data(X,Y,Z)."]
+    if candidate_inputs:
+        program += ["% is_mirna/1 is given for feasible inputs"]
+    elif data_encoding == "dense":
+        program += ["is_mirna(Y) :- data(X,Y,Z)."]
+    else:
+        program += ["is_mirna(Y) :- sparse_value(Y,Z)."]
     program += ['is_sign(positive). is_sign(negative).']
     program += ['']
     program += ['']
@@ -228,12 +568,11 @@ def csv2asp(fname_csv,
     program += ['1 {gate_type(GateID, X): is_gate_type(X)} 1 :- is_gate_id(GateID).']
     program += ['']
 
-    if efficiency_constraint:
-        program += ['% inputs for gates (EfficiencyConstraint=True)']
-        program += ['feasible_pos_miRNA(MiRNA) :- data(TissueID, MiRNA, high), tissue(TissueID,cancer).']
-        program += ['feasible_neg_miRNA(MiRNA) :- data(TissueID, MiRNA, low),  tissue(TissueID,cancer).']
-        program += ['feasible_pos_miRNA(MiRNA) :- gate_input(GateID, positive, MiRNA).']
-        program += ['feasible_neg_miRNA(MiRNA) :- gate_input(GateID, negative, MiRNA).']
+    if candidate_inputs:
+        program += ['% inputs for gates (feasible inputs)']
+        program += ['% feasible_pos_miRNA/1 and feasible_neg_miRNA/1 are computed from the data']
+        program += [':- gate_input(GateID, positive, MiRNA), not feasible_pos_miRNA(MiRNA).']
+        program += [':- gate_input(GateID, negative, MiRNA), not feasible_neg_miRNA(MiRNA).']
         program += ['']
         program += ['X {gate_input(GateID, positive, MiRNA): feasible_pos_miRNA(MiRNA)} Y '
                     ':- gate_type(GateID, GateType), lower_bound_pos_inputs(GateType, X), '
@@ -286,6 +625,11 @@ def csv2asp(fname_csv,
         program += ["gate_fires(GateID,TissueID) :- gate_input(GateID,positive,MiRNA), data(TissueID,MiRNA,high)."]
         # gate fires if at least one input in a negative gate is low (0)
         program += ["gate_fires(GateID,TissueID) :- gate_input(GateID,negative,MiRNA), data(TissueID,MiRNA,low)."]
+        if data_encoding != "dense":  # values that are not written are derived by default negation
+            program += ["gate_fires(GateID,TissueID) :- gate_input(GateID,positive,MiRNA), sparse_value(MiRNA,low), "
+                        "is_tissue_id(TissueID), not data(TissueID,MiRNA,low)."]
+            program += ["gate_fires(GateID,TissueID) :- gate_input(GateID,negative,MiRNA), sparse_value(MiRNA,high), "
+                        "is_tissue_id(TissueID), not data(TissueID,MiRNA,high)."]
         program += ['']
 
         program += ['% prediction of classifier']
@@ -307,6 +651,11 @@ def csv2asp(fname_csv,
         program += ["gate_fires(GateID,TissueID) :- gate_input(GateID,positive,MiRNA), data(TissueID,MiRNA,low)."]
         # gate fires if at least one input in a negative gate is high (1)
         program += ["gate_fires(GateID,TissueID) :- gate_input(GateID,negative,MiRNA), data(TissueID,MiRNA,high)."]
+        if data_encoding != "dense":  # values that are not written are derived by default negation
+            program += ["gate_fires(GateID,TissueID) :- gate_input(GateID,positive,MiRNA), sparse_value(MiRNA,high), "
+                        "is_tissue_id(TissueID), not data(TissueID,MiRNA,high)."]
+            program += ["gate_fires(GateID,TissueID) :- gate_input(GateID,negative,MiRNA), sparse_value(MiRNA,low), "
+                        "is_tissue_id(TissueID), not data(TissueID,MiRNA,low)."]
         program += ['']
 
         program += ['% prediction of classifier']
@@ -327,8 +676,14 @@ def csv2asp(fname_csv,
         if add_bounds_on_errors is True:
             program += ['upper_bound_falsepos(%i).' % upper_bound_false_pos]
             program += ['upper_bound_falseneg(%i).' % upper_bound_false_neg]
-        program += [':- X+1 {tissue(TissueID,healthy) : classifier(TissueID,cancer)}, upper_bound_falsepos(X).']
-        program += [':- X+1 {tissue(TissueID,cancer) : classifier(TissueID,healthy)}, upper_bound_falseneg(X).']
+        if data.weights is None:
+            program += [':- X+1 {tissue(TissueID,healthy) : classifier(TissueID,cancer)}, upper_bound_falsepos(X).']
+            program += [':- X+1 {tissue(TissueID,cancer) : classifier(TissueID,healthy)}, upper_bound_falseneg(X).']
+        else:  # each sample stands for tissue_weight merged samples
+            program += [':- X+1 #sum{W,TissueID: tissue(TissueID,healthy), classifier(TissueID,cancer), '
+                        'tissue_weight(TissueID,W)}, upper_bound_falsepos(X).']
+            program += [':- X+1 #sum{W,TissueID: tissue(TissueID,cancer), classifier(TissueID,healthy), '
+                        'tissue_weight(TissueID,W)}, upper_bound_falseneg(X).']
         program += ['']
 
     if break_symmetries:
@@ -340,6 +695,59 @@ def csv2asp(fname_csv,
         program += ['']
         program += ['']
 
+    if order_gates or project_classifiers:
+        # gates are compared at the first miRNA at which they differ, a positive input comes before a negative
+        # input and a negative input comes before no input
+        program += ['%%% Lexicographic comparison of gates']
+        if project_classifiers:
+            program += ['gate_pair(GateID1,GateID2) :- is_gate_id(GateID1), is_gate_id(GateID2), GateID1 < GateID2.']
+        else:
+            program += ['gate_pair(GateID1,GateID2) '
+                        ':- gate_type(GateID1,GateType), gate_type(GateID2,GateType), GateID1 < GateID2.']
+        program += ['gates_differ(GateID1,GateID2,MiRNA) '
+                    ':- gate_pair(GateID1,GateID2), gate_input(GateID1,Sign,MiRNA), '
+                    'not gate_input(GateID2,Sign,MiRNA).']
+        program += ['gates_differ(GateID1,GateID2,MiRNA) '
+                    ':- gate_pair(GateID1,GateID2), gate_input(GateID2,Sign,MiRNA), '
+                    'not gate_input(GateID1,Sign,MiRNA).']
+        program += ['% gates agree on all miRNAs before MiRNA']
+        program += ['gates_agree_before(GateID1,GateID2,MiRNA) :- gate_pair(GateID1,GateID2), first_mirna(MiRNA).']
+        program += ['gates_agree_before(GateID1,GateID2,MiRNA) '
+                    ':- gates_agree_before(GateID1,GateID2,Prev), next_mirna(Prev,MiRNA), '
+                    'not gates_differ(GateID1,GateID2,Prev).']
+        program += ['first_difference(GateID1,GateID2,MiRNA) '
+                    ':- gates_agree_before(GateID1,GateID2,MiRNA), gates_differ(GateID1,GateID2,MiRNA).']
+        program += ['gate_before(GateID1,GateID2) '
+                    ':- first_difference(GateID1,GateID2,MiRNA), gate_input(GateID1,positive,MiRNA).']
+        program += ['gate_before(GateID1,GateID2) '
+                    ':- first_difference(GateID1,GateID2,MiRNA), gate_input(GateID1,negative,MiRNA), '
+                    'not gate_input(GateID2,positive,MiRNA).']
+        program += ['gate_before(GateID2,GateID1) '
+                    ':- first_difference(GateID1,GateID2,MiRNA), gate_input(GateID2,positive,MiRNA).']
+        program += ['gate_before(GateID2,GateID1) '
+                    ':- first_difference(GateID1,GateID2,MiRNA), gate_input(GateID2,negative,MiRNA), '
+                    'not gate_input(GateID1,positive,MiRNA).']
+        program += ['']
+
+    if order_gates:
+        program += ['%%% Lexicographic order of gates of the same type (OrderGates=True)']
+        program += [':- gate_type(GateID1,GateType), gate_type(GateID2,GateType), GateID1 < GateID2, '
+                    'gate_before(GateID2,GateID1).']
+        program += ['']
+
+    if project_classifiers:
+        # gates are renamed by their rank in the lexicographic order, so classifiers that only differ
+        # in gate ids (or gate types) have the same classifier_input/3 atoms
+        program += ['%%% Projection on classifiers without gate ids (ProjectClassifiers=True, see clasp --project)']
+        program += ['gate_rank(GateID,Rank) '
+                    ':- is_gate_id(GateID), Rank = #count{GateID2: gate_before(GateID2,GateID)}.']
+        program += ['classifier_input(Rank,Sign,MiRNA) :- gate_input(GateID,Sign,MiRNA), gate_rank(GateID,Rank).']
+        program += ['#project classifier_input/3.']
+        program += ['']
+
+    if order_gates or project_classifiers:
+        program += ['']
+
     if optimization_strategy == 1:
         program += ['% optimization setup 1: first number of inputs then number of gates.']
         program += ['#minimize{ 1@1,(GateID,MiRNA): gate_input(GateID,Sign,MiRNA) }.']
@@ -364,13 +772,20 @@ def csv2asp(fname_csv,
     program += ['']
     program += ["#show gate_input/3."]
 
-    datafile = instance + program
+    program = "\n".join(program)
 
-    if fname_asp is None:
-        return "\n".join(datafile)
+    if stream is not None:
+        stream.write("\n")
+        stream.write(program)
+        if fname_asp is None:
+            return None
+    elif fname_asp is None:
+        return instance + "\n" + program
     else:
         with open(fname_asp, 'w') as f:
-            f.writelines("\n".join(datafile))
+            f.write(instance)
+            f.write("\n")
+            f.write(program)
 
     if not silent:
         print("\ncreated:", fname_asp)
@@ -379,6 +794,9 @@ def csv2asp(fname_csv,
         else:
             print("now run: gringo %s | clasp -n0" % fname_asp)
 
+    if stream is not None:
+        return None
+
     return instance, program
 
 
@@ -473,15 +891,35 @@ def gateinputs2function(gate_inputs):
     return function
 
 
-def check_classifier(fname_csv, gate_inputs):
+def load_packed_data(fname_csv):
+
+    """
+    Loads a data set once into memory (bit-packed), so it may be reused for evaluation of many classifiers.
+
+    Parameters
+    ----------
+    fname_csv : str or Dataset
+        name of input file or loaded data set
+
+    Returns
+    -------
+    PackedData
+        packed data set
+
+    """
+
+    return dataset.load_dataset(fname_csv).packed()
+
+
+def check_classifier(data, gate_inputs):
 
     """
     Calculates the number of false positive and negative errors of a classifier for a given data set.
 
     Parameters
     ----------
-    fname_csv : str
-        name of input file
+    data : str, Dataset or PackedData
+        name of input file, loaded data set or data set loaded with load_packed_data
     gate_inputs : str
         classifier
 
@@ -497,41 +935,11 @@ def check_classifier(fname_csv, gate_inputs):
     #Example for GateInputs: gate_input(1,positive,g189) gate_input(1,positive,g224) gate_input(2,positive,g89)
     #gate_input(2,positive,g108) gate_input(2,positive,g154) gate_input(3,negative,g31)
 
-    #print("\n--- check_classifier")
-
-    miRNAs, rows = csv2rows(fname_csv)
-
-    #print(" miRNAs: ", len(miRNAs))
-    #print(" samples:", len(rows))
-
-    false_neg = 0
-    false_pos = 0
-
-    function = gateinputs2function(gate_inputs)
-    #print(" testing each sample against the function..")
-    hits = set([])
-    for x in rows:
-        fp, fn, malfunction = function(x)
-        if fp:
-            false_pos += 1
-        if fn:
-            false_neg += 1
-
-        #if malfunction:
-            #hits.add(x["ID"])
-            #for location in malfunction:
-                #print(" ** found malfunction:")
-                #for item in sorted(location.items()):
-                    #print("    %s = %s"%item)
-
-    #print(" classifier =",GateInputs)
-    #print(" data =",FnameCSV)
-    #if hits:
-        #print(" result = %i inconsistencies"%(len(hits)), hits)
-        #print(" false positives:", false_pos)
-        #print(" false negatives:", false_neg)
-    #else:
-        #print(" result = classifier and data are consistent")
+    if not isinstance(data, packed_evaluator.PackedData):  # load data set if file name is given
+        data = load_packed_data(data)
+
+    # evaluate classifier for all samples at once on bit-packed data
+    false_neg, false_pos, predictions = packed_evaluator.evaluate(data, gate_inputs)
 
     return false_neg, false_pos
 
@@ -540,42 +948,63 @@ def check_csv(fname_csv):
 
     """
     Counts how many features are constant across all samples, and checks if there are inconsistencies in the data
-    (identical feature profile but different annotation)
+    (identical feature profile but different annotation). Samples are grouped by their bit-packed feature profiles
+    and constant features are found by column reductions, so the check takes linear time.
 
     Parameters
     ----------
-    fname_csv : str
-        name of input data file
+    fname_csv : str or Dataset
+        name of input data file or loaded data set
+
+    Returns
+    -------
+    inconsistent_groups : list
+        lists of IDs of samples with identical feature profiles but different annotations
+    constants : list
+        names of features constant across all samples
+    duplicates : list
+        lists of IDs of samples with identical feature profiles
 
     """
 
     print("\n--- check_csv")
 
-    miRNAs, rows = csv2rows(fname_csv)
-    print(" miRNAs: ", len(miRNAs))
-    print(" samples:", len(rows))
+    data = dataset.load_dataset(fname_csv)
+    print(" miRNAs: ", len(data.features))
+    print(" samples:", len(data.ids))
 
-    healthy = sum([1 for x in rows if x["Annots"]=="0"])
+    healthy = int((data.annots == 0).sum())
     print("  healthy: %i"%healthy)
-    print("  cancer: %i"%(len(rows)-healthy))
+    print("  cancer: %i"%(len(data.ids)-healthy))
+
+    # group samples by feature profiles (packed rows are used as keys)
+    profiles = {}
+    for x, profile in enumerate(numpy.packbits(data.matrix, axis=1)):
+        profiles.setdefault(profile.tobytes(), []).append(x)
+
+    duplicates = [group for group in profiles.values() if len(group) > 1]
 
     inconsistencies = []
-    seen = []
-    for x in rows:
-        for y in seen:
-            if all(x[rna]==y[rna] for rna in miRNAs):
-                if x["Annots"]!=y["Annots"]:
-                    inconsistencies.append(x["ID"])
-        seen.append(x)
+    inconsistent_groups = []
+    for group in duplicates:
+        annots = data.annots[group]
+        if (annots != annots[0]).any():
+            inconsistent_groups.append([data.ids[x] for x in group])
+            # samples that have the same profile as an earlier sample with different annotation
+            inconsistencies += [data.ids[x] for i, x in enumerate(group) if (annots[:i] != annots[i]).any()]
+
+    duplicates = [[data.ids[x] for x in group] for group in duplicates]
 
     constants = []
-    for rna in miRNAs:
-        value = rows[0][rna]
-        if all(x[rna]==value for x in rows):
-            constants.append(rna)
+    if len(data.ids) != 0:
+        is_constant = data.matrix.min(axis=0) == data.matrix.max(axis=0)
+        constants = [data.features[i] for i in numpy.flatnonzero(is_constant)]
 
     print(" inconsistencies (%i): %s"%(len(inconsistencies),",".join(inconsistencies) or "-"))
     print(" constants (%i): %s"%(len(constants),",".join(constants) or "-"))
+    print(" duplicate profiles (%i): %s"%(len(duplicates),";".join(",".join(x) for x in duplicates) or "-"))
+
+    return inconsistent_groups, constants, duplicates
 
 
 if __name__=="__main__":
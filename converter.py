@@ -42,12 +42,196 @@ def convert_solution_to_list(inputs):
     return new_solution
 
 
+# class for interned names of features
+class FeatureTable:
+
+    """
+
+    Class representing a table of interned names of features, compact classifiers store indices of features.
+    A table is shared by results of a single training run and travels with them (e.g., when pickled).
+
+    Attributes
+    ----------
+    features : list
+        names of features
+    index : dict
+        names of features mapped to their indices
+
+    Methods
+    -------
+    intern(feature)
+        Returns the index of a feature.
+    """
+
+    def __init__(self):
+        self.features = []  # names of features
+        self.index = {}  # indices of features
+
+    def intern(self, feature):
+
+        """
+
+        Returns the index of a feature (the feature is added if needed).
+
+        Parameters
+        ----------
+        feature : str
+            name of feature
+
+        Returns
+        ----------
+        int
+            index of feature
+
+        """
+
+        index = self.index.get(feature)
+        if index is None:
+            index = len(self.features)
+            self.features.append(feature)
+            self.index[feature] = index
+
+        return index
+
+
+# encode ASP answer as compact classifier
+def encode_answer(answer, table):
+
+    """
+
+    Encodes a single ASP answer as a compact classifier. A classifier is a tuple of gates (ordered as in
+    the string format, see convert_asp_results), a gate is a tuple of small integers: the gate id followed
+    by inputs, each input is 2 * index of feature in the table + 1 if the input is negative.
+
+    Parameters
+    ----------
+    answer : frozenset
+        answer in a solver-returned format
+    table : FeatureTable
+        interned names of features
+
+    Returns
+    ----------
+    tuple
+        compact classifier
+
+    """
+
+    gates = {}
+    for atom in answer:  # atom[1][0] - gate id, atom[1][1] - sign and atom[1][2]] - feature id
+        gate_id, sign, feature = atom[1]
+        gates.setdefault(gate_id, []).append(2 * table.intern(feature) + (sign == "negative"))
+
+    return tuple((gate_id,) + tuple(sorted(gates[gate_id])) for gate_id in sorted(gates, key=str))
+
+
+# convert compact classifier to string
+def classifier2str(classifier, table):
+
+    """
+
+    Converts a compact classifier to a string, e.g., gate_input(1,positive,miR_1) gate_input(2,negative,miR_2)
+
+    Parameters
+    ----------
+    classifier : tuple
+        compact classifier (see encode_answer)
+    table : FeatureTable
+        interned names of features
+
+    Returns
+    ----------
+    str
+        classifier as a string
+
+    """
+
+    input_list = [[str(gate[0]), "negative" if code & 1 else "positive", table.features[code >> 1]]
+                  for gate in classifier for code in gate[1:]]
+
+    # sort inputs by gate id and then alphabetically
+    input_list.sort(key=lambda inputs: (inputs[0], inputs))
+
+    return "".join(["gate_input(" + ",".join(inputs) + ") " for inputs in input_list])
+
+
+# convert compact classifier to list of gates
+def classifier2gates(classifier, table):
+
+    """
+
+    Converts a compact classifier to a sorted list of gates, each gate is a sorted list of (feature, sign) inputs.
+
+    Parameters
+    ----------
+    classifier : tuple
+        compact classifier (see encode_answer)
+    table : FeatureTable
+        interned names of features
+
+    Returns
+    ----------
+    list
+        classifier as a list of gates
+
+    """
+
+    return sorted(sorted((table.features[code >> 1], "negative" if code & 1 else "positive") for code in gate[1:])
+                  for gate in classifier)
+
+
+# number of inputs of compact classifier
+def classifier_size(classifier):
+
+    """
+
+    Returns the number of inputs of a compact classifier.
+
+    Parameters
+    ----------
+    classifier : tuple
+        compact classifier (see encode_answer)
+
+    Returns
+    ----------
+    int
+        number of inputs
+
+    """
+
+    return sum(len(gate) - 1 for gate in classifier)
+
+
+# number of inputs of ASP answer
+def answer_size(answer):
+
+    """
+
+    Returns the number of inputs of a single ASP answer (without converting it).
+
+    Parameters
+    ----------
+    answer : frozenset
+        answer in a solver-returned format
+
+    Returns
+    ----------
+    int
+        number of inputs
+
+    """
+
+    return sum(1 for atom in answer if atom[0] == "gate_input")
+
+
 # convert ASP results to strings and lists of gates
-def convert_asp_results(results):
+def convert_asp_results(results, verbosity=1, table=None):
 
     """
 
-    Converts ASP answers to a lists of lists and string.
+    Converts ASP answers to a lists of lists and string. The conversion is lazy: answers are encoded
+    as compact classifiers (see encode_answer) when first requested and both formats are generated from them
+    when requested (see trainer.Result), so results removed by filters are never converted.
 
     Format:
 
@@ -60,6 +244,10 @@ def convert_asp_results(results):
     ----------
     results : list
         list containing results in a solver-returned format
+    verbosity : int
+        0 - no output, 1 - number of solutions of each result, 2 - all solutions as well (converts them)
+    table : FeatureTable
+        interned names of features shared by the results (None - a new table)
 
     Returns
     ----------
@@ -69,43 +257,29 @@ def convert_asp_results(results):
     """
 
     size = 0
+    if table is None:
+        table = FeatureTable()
 
-    print("\nPRINTING RESULTS:")
+    if verbosity >= 1:
+        print("\nPRINTING RESULTS:")
     # iterate over found results
     for result in results:
-        print("\n##SUM: ", result.errors, "##")  # total number of errors for solutions in result
-        print("FP: ", result.fp, "FN: ", result.fn)  # number of false positives and negatives
-        print("Number of solutions: ", len(result.solutions_str))  # number of solutions in result
-
-        solutions_by_str = []
-        solutions_by_gate = []
-
-        # iterate over solutions in result
-        for solution in result.solutions_str:
-
-            # iterate over atoms in solution (contains: gate id, sign and feature id)
-            input_list = []
-            for atom in solution:  # atom[1][0] - gate id, atom[1][1] - sign and atom[1][2]] - feature id
-                input_list.append([str(atom[1][0]), atom[1][1], atom[1][2]])
-
-            # sort inputs by gate id and then alphabetically
-            input_list.sort(key=lambda inputs: (inputs[0], inputs))
-
-            inputs_str = []  # keep inputs as strings
-            for i in input_list:
-                input_str = ",".join(i)
-                inputs_str.append("".join(['gate_input', '(', input_str, ') ']))
-
-            size = len(input_list)  # check the current size of classifier
-
-            new_solution = convert_solution_to_list(input_list)  # convert solution to list of gates
-
-            print("".join(inputs_str))  # show solution
-            solutions_by_str.append("".join(inputs_str))  # add solution as string
-            solutions_by_gate.append(sorted(new_solution))  # add solution as list of gates
-
-        result.solutions_str = solutions_by_str  # replace all solutions as strings in result
-        result.solutions_by_gate = solutions_by_gate  # add all solutions as lists of gates in result
+        answers = result.solutions_str  # answers in a solver-returned format
+        if len(answers) != 0:
+            size = answer_size(answers[-1])  # check the current size of classifier
+
+        result.answers = answers  # answers are encoded when requested
+        result.table = table  # interned names of features of compact classifiers
+        result.solutions_str = None
+        result.solutions_by_gate = None
         result.size = size  # add size of solutions in single result
 
+        if verbosity >= 1:
+            print("\n##SUM: ", result.errors, "##")  # total number of errors for solutions in result
+            print("FP: ", result.fp, "FN: ", result.fn)  # number of false positives and negatives
+            print("Number of solutions: ", result.count())  # number of solutions in result
+        if verbosity >= 2:
+            for solution in result.solutions_str:
+                print(solution)  # show solution
+
     return results
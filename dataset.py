@@ -0,0 +1,332 @@
+import csv
+import hashlib
+import json
+import os
+import shutil
+import numpy
+import packed_evaluator
+
+
+# class for data set
+class Dataset:
+
+    """
+
+    Class representing a discretized data set in a compact columnar form.
+
+    Attributes
+    ----------
+    path : str
+        name of input file
+    ids : list
+        sample IDs
+    annots : numpy.ndarray
+        annotation of samples (1 - cancer, 0 - healthy, -1 - other)
+    features : list
+        names of features
+    feature_index : dict
+        feature names mapped to column indices
+    matrix : numpy.ndarray
+        binary feature matrix (samples x features, uint8), 1 if feature is high (1) in the sample
+    weights : numpy.ndarray
+        number of original samples represented by each sample (None if samples were not deduplicated)
+    cache_path : str
+        directory of the on-disk cache the matrix is memory-mapped from (None if not cached)
+
+    Methods
+    -------
+    from_csv(fname_csv)
+        Reads a data set from a csv file.
+    column(feature)
+        Returns values of a feature for all samples.
+    rows()
+        Returns the data set as a list of dictionaries (see classifier.csv2rows).
+    packed()
+        Returns the data set with bit-packed feature columns.
+    deduplicated()
+        Returns the data set with samples of identical profiles and annotations merged.
+    """
+
+    def __init__(self, path, ids, annots, features, matrix, weights=None):
+        self.path = path  # name of input file
+        self.ids = list(ids)  # sample IDs
+        self.annots = numpy.asarray(annots, dtype=numpy.int8)  # annotation of samples
+        self.features = list(features)  # names of features
+        self.feature_index = {feature: i for i, feature in enumerate(self.features)}  # column of feature
+        self.matrix = numpy.asarray(matrix, dtype=numpy.uint8).reshape(len(self.ids), len(self.features))
+        self.weights = None if weights is None else numpy.asarray(weights, dtype=numpy.int64)  # multiplicities
+        self.cache_path = None  # on-disk cache of the data set
+        self._packed = None  # bit-packed data set, created on demand
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_packed"] = None
+        if self.cache_path is not None:  # cached data is mapped again instead of being copied
+            del state["matrix"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if "matrix" not in state:
+            self.matrix = numpy.load(os.path.join(self.cache_path, "matrix.npy"), mmap_mode="r")
+
+    @classmethod
+    def from_csv(cls, fname_csv):
+
+        """
+
+        Reads a data set from a csv file (';' as delimiter, ID and Annots columns followed by features).
+
+        Parameters
+        ----------
+        fname_csv : str
+            name of input file
+
+        Returns
+        -------
+        Dataset
+            data set
+
+        """
+
+        with open(fname_csv, 'r') as f:
+            reader = csv.reader(f, delimiter=";")
+            header = []
+            for x in reader:
+                if not x: continue
+                header = [y.strip() for y in x]
+                break
+
+            id_column = header.index("ID")
+            annots_column = header.index("Annots")
+            feature_columns = [i for i, x in enumerate(header) if x not in ["ID", "Annots"]]
+            features = [header[i] for i in feature_columns]
+
+            IDs = set([])
+            ids = []
+            annots = []
+            rows = []
+            for x in reader:
+                if not x: continue
+                if not x[0].strip(): continue
+                values = [y.strip() for y in x]
+                if values[id_column] in IDs:
+                    print("\n***ERROR: row IDs must be unique, found duplicate (%s)." % values[id_column])
+                    raise Exception
+                IDs.add(values[id_column])
+                ids.append(values[id_column])
+                annots.append(1 if values[annots_column] == "1" else 0 if values[annots_column] == "0" else -1)
+                rows.append(numpy.array([values[i] == "1" for i in feature_columns], dtype=numpy.uint8))
+
+        matrix = numpy.array(rows, dtype=numpy.uint8).reshape(len(ids), len(features))
+
+        return cls(fname_csv, ids, annots, features, matrix)
+
+    def column(self, feature):
+
+        """
+
+        Returns values of a feature for all samples.
+
+        Parameters
+        ----------
+        feature : str
+            name of feature
+
+        Returns
+        -------
+        numpy.ndarray
+            values of the feature (uint8)
+
+        """
+
+        return self.matrix[:, self.feature_index[feature]]
+
+    def rows(self):
+
+        """
+
+        Returns the data set as a list of dictionaries (see classifier.csv2rows).
+
+        Returns
+        -------
+        list
+            data
+
+        """
+
+        annots = {1: "1", 0: "0", -1: "-1"}
+        rows = []
+        for sample_id, annot, values in zip(self.ids, self.annots.tolist(), self.matrix.tolist()):
+            row = dict(zip(self.features, [str(value) for value in values]))
+            row["ID"] = sample_id
+            row["Annots"] = annots[annot]
+            rows.append(row)
+
+        return rows
+
+    def packed(self):
+
+        """
+
+        Returns the data set with bit-packed feature columns (created once).
+
+        Returns
+        -------
+        PackedData
+            packed data set
+
+        """
+
+        if self._packed is None:
+            self._packed = packed_evaluator.PackedData(self.features, self.ids, self.matrix, self.annots)
+
+        return self._packed
+
+    def deduplicated(self):
+
+        """
+
+        Returns the data set with samples of identical feature profiles and annotations merged into the first
+        of them. Number of merged samples is kept in weights.
+
+        Returns
+        -------
+        Dataset
+            data set with unique (profile, annotation) pairs
+
+        """
+
+        weights = numpy.ones(len(self.ids), dtype=numpy.int64) if self.weights is None else self.weights
+
+        # group samples by packed profiles and annotations
+        groups = {}
+        for x, profile in enumerate(numpy.packbits(self.matrix, axis=1)):
+            groups.setdefault((profile.tobytes(), int(self.annots[x])), []).append(x)
+
+        firsts = [group[0] for group in groups.values()]
+        merged_weights = [int(weights[group].sum()) for group in groups.values()]
+
+        return Dataset(self.path, [self.ids[x] for x in firsts], self.annots[firsts], self.features,
+                       self.matrix[firsts], merged_weights)
+
+
+# compute key of cached data set
+def cache_key(fname_csv):
+
+    """
+
+    Computes a key of a data set file based on its path, size and modification time.
+
+    Parameters
+    ----------
+    fname_csv : str
+        name of input file
+
+    Returns
+    -------
+    str
+        key of the data set
+
+    """
+
+    stat = os.stat(fname_csv)
+    description = "|".join([os.path.abspath(fname_csv), str(stat.st_size), str(stat.st_mtime_ns)])
+
+    return hashlib.sha1(description.encode()).hexdigest()
+
+
+# write data set to on-disk cache
+def write_cache(data, cache_path):
+
+    """
+
+    Writes a data set to an on-disk cache directory (the matrix is stored as a memory-mappable .npy file).
+
+    Parameters
+    ----------
+    data : Dataset
+        data set
+    cache_path : str
+        cache directory of the data set
+
+    """
+
+    temp_path = "%s.%i.tmp" % (cache_path, os.getpid())
+    os.makedirs(temp_path)
+
+    numpy.save(os.path.join(temp_path, "matrix.npy"), data.matrix)
+    numpy.save(os.path.join(temp_path, "annots.npy"), data.annots)
+    with open(os.path.join(temp_path, "meta.json"), "w") as f:
+        json.dump({"path": data.path, "ids": data.ids, "features": data.features}, f)
+
+    try:
+        os.rename(temp_path, cache_path)  # publish complete cache at once
+    except OSError:  # cache was written by another process in the meantime
+        shutil.rmtree(temp_path, ignore_errors=True)
+
+
+# read data set from on-disk cache
+def read_cache(cache_path):
+
+    """
+
+    Reads a data set from an on-disk cache directory. The matrix is memory-mapped, not copied.
+
+    Parameters
+    ----------
+    cache_path : str
+        cache directory of the data set
+
+    Returns
+    -------
+    Dataset
+        data set
+
+    """
+
+    with open(os.path.join(cache_path, "meta.json"), "r") as f:
+        meta = json.load(f)
+    annots = numpy.load(os.path.join(cache_path, "annots.npy"))
+    matrix = numpy.load(os.path.join(cache_path, "matrix.npy"), mmap_mode="r")
+
+    data = Dataset(meta["path"], meta["ids"], annots, meta["features"], matrix)
+    data.cache_path = cache_path
+
+    return data
+
+
+# load data set
+def load_dataset(data, cache_dir=None):
+
+    """
+
+    Loads a data set from a csv file. If cache_dir is given, the parsed data set is stored there
+    on the first run and memory-mapped by later runs instead of parsing the csv file again.
+
+    Parameters
+    ----------
+    data : str or Dataset
+        name of input file or already loaded data set
+    cache_dir : str
+        directory of the on-disk cache of parsed data sets (None - no cache)
+
+    Returns
+    -------
+    Dataset
+        data set
+
+    """
+
+    if isinstance(data, Dataset):
+        return data
+
+    if cache_dir is None:
+        return Dataset.from_csv(data)
+
+    cache_path = os.path.join(cache_dir, cache_key(data))
+    if not os.path.isdir(cache_path):
+        os.makedirs(cache_dir, exist_ok=True)
+        write_cache(Dataset.from_csv(data), cache_path)
+
+    return read_cache(cache_path)
@@ -3,6 +3,7 @@ import os
 import sys
 import classifier
 import feature_analyser
+import packed_evaluator
 
 
 # calculate balanced accuracy score
@@ -49,9 +50,10 @@ def test_classifiers(solutions, test_data, train_p, train_n, test_p, test_n):
     Parameters
     ----------
     solutions : list
-        list of found solutions
-    test_data : str
-        test data set
+        list of found solutions (any iterable is consumed once)
+    test_data : str, Dataset or PackedData
+        test data set file or loaded test data set (parsed only once, all solutions are evaluated on the packed
+        test data at once, see packed_evaluator.evaluate_many)
     train_p : int
         number of positives in train data
     train_n : int
@@ -67,6 +69,15 @@ def test_classifiers(solutions, test_data, train_p, train_n, test_p, test_n):
     print("############TESTING CLASSIFIERS############")
     print("###########################################\n")
 
+    solutions = list(solutions)
+
+    # parse test data set once and evaluate all solutions at once (gates shared by solutions are evaluated once)
+    test_scores = []
+    if test_data is not None:
+        if not isinstance(test_data, packed_evaluator.PackedData):
+            test_data = classifier.load_packed_data(test_data)
+        test_scores = packed_evaluator.evaluate_many(test_data, [solution.solutions_by_gate for solution in solutions])
+
     bacc_train_list = []
     bacc_test_list = []
     tpr_test_list = []
@@ -74,13 +85,15 @@ def test_classifiers(solutions, test_data, train_p, train_n, test_p, test_n):
     size_list = []
 
     solution_id = 1
-    for solution in solutions:  # iterate over solutions
+    for i, solution in enumerate(solutions):  # iterate over solutions
 
         # train data scores
         print("\nSOLUTION ", solution_id)  # show solution id
         solution_id += 1
         print("##SUM: ", solution.errors, "##")  # show number of errors
         print("FP: ", solution.fp, "FN: ", solution.fn)  # show number of false positives and negatives
+        if not solution.optimal:
+            print("NOT PROVEN OPTIMAL (solver call interrupted)")
         tp = train_p - solution.fn  # calculate number of true positives
         tn = train_n - solution.fp  # calculate number of true negatives
         train_bacc = calculate_balanced_accuracy(tp, tn, train_p, train_n)  # calculate train bacc
@@ -91,8 +104,8 @@ def test_classifiers(solutions, test_data, train_p, train_n, test_p, test_n):
 
         if test_data is not None:
             # test data scores
-            # calculate false positives and negatives
-            fn, fp = classifier.check_classifier(test_data, solution.solutions_str)
+            # false positives and negatives
+            fn, fp = test_scores[i]
             print("FP: ", fp, " FN: ", fn)
             tp = test_p - fn  # calculate true positives
             tpr_test_list.append(tp/test_p)  # calculate true positive rate and add to list
@@ -0,0 +1,364 @@
+import itertools
+import numpy
+import dataset
+
+
+# class for mapping of reduced features
+class FeatureReduction:
+
+    """
+
+    Class representing a reduction of features. Each group of features with identical (or complementary)
+    values across all samples is represented by a single feature, constant features are removed.
+
+    Attributes
+    ----------
+    representatives : list
+        names of kept features
+    duplicates : dict
+        kept features mapped to removed features with identical values
+    complements : dict
+        kept features mapped to removed features with complementary values
+    constants : list
+        names of removed constant features
+
+    Methods
+    -------
+    alternatives(feature, sign)
+        Returns inputs equivalent to an input.
+    expansions(answer)
+        Returns the number of answers equivalent to an answer.
+    expand(solutions)
+        Expands answers to all equivalent answers.
+    """
+
+    def __init__(self):
+        self.representatives = []  # kept features
+        self.duplicates = {}  # identical features of kept features
+        self.complements = {}  # complementary features of kept features
+        self.constants = []  # constant features
+
+    def alternatives(self, feature, sign):
+
+        """
+
+        Returns inputs equivalent to an input (the input itself first). A complementary feature
+        is used with the opposite sign.
+
+        Parameters
+        ----------
+        feature : str
+            name of feature
+        sign : str
+            positive or negative
+
+        Returns
+        -------
+        list
+            list of (feature, sign) inputs
+
+        """
+
+        opposite = "negative" if sign == "positive" else "positive"
+
+        return [(feature, sign)] + [(x, sign) for x in self.duplicates.get(feature, [])] \
+            + [(x, opposite) for x in self.complements.get(feature, [])]
+
+    def expansions(self, answer):
+
+        """
+
+        Returns the number of answers equivalent to an answer found on reduced data (without expanding it).
+
+        Parameters
+        ----------
+        answer : frozenset
+            answer (formatted as returned by Clyngor)
+
+        Returns
+        -------
+        int
+            number of equivalent answers
+
+        """
+
+        count = 1
+        for predicate, args in answer:
+            if predicate == "gate_input":
+                count *= len(self.alternatives(str(args[2]), args[1]))
+
+        return count
+
+    def expand(self, solutions):
+
+        """
+
+        Expands answers found on reduced data to all equivalent answers on the original features.
+        Answers are generated one by one, so they are not kept in memory together.
+
+        Parameters
+        ----------
+        solutions : iterable
+            answers (formatted as returned by Clyngor)
+
+        Yields
+        ------
+        frozenset
+            equivalent answer
+
+        """
+
+        for answer in solutions:
+            inputs = [args for predicate, args in answer if predicate == "gate_input"]
+            other = [atom for atom in answer if atom[0] != "gate_input"]
+            # every input may be replaced by any of its equivalent inputs
+            choices = [[(gate_id, new_sign, new_feature)
+                        for new_feature, new_sign in self.alternatives(str(feature), sign)]
+                       for gate_id, sign, feature in inputs]
+            for combination in itertools.product(*choices):
+                yield frozenset(other + [("gate_input", args) for args in combination])
+
+
+# check whether inputs may change their signs
+def sign_swaps_allowed(gate_types, upper_bound_inputs):
+
+    """
+
+    Checks whether any input of a gate may change its sign, as it does when a complementary feature replaces
+    a merged feature (see reduce_features). It is allowed only if no gate type has lower bounds on positive
+    or negative inputs and each gate type allows any of its gates to have only positive or only negative inputs.
+
+    Parameters
+    ----------
+    gate_types : list
+        description of allowed gates (see classifier.csv2asp)
+    upper_bound_inputs : int
+        upper bound on number of inputs in classifier
+
+    Returns
+    -------
+    bool
+        True if signs of inputs may be changed
+
+    """
+
+    for gate_type in gate_types:
+        if gate_type["LowerBoundPos"] > 0 or gate_type["LowerBoundNeg"] > 0:
+            return False
+        # the largest gate of this type
+        gate_size = min(upper_bound_inputs, gate_type["UpperBoundPos"] + gate_type["UpperBoundNeg"])
+        if min(gate_type["UpperBoundPos"], gate_type["UpperBoundNeg"]) < gate_size:
+            return False
+
+    return True
+
+
+# check whether answers on reduced features expand to all answers
+def reduction_allowed(gate_types, lower_bound_inputs, lower_bound_gates, uniqueness_constraint,
+                      optimization_strategy):
+
+    """
+
+    Checks whether answers found on reduced data (see reduce_features) expand to all answers on the original
+    features. It is not the case if inputs must be unique across the classifier (identical features may be
+    inputs of different gates, a merged feature may not), if lower bounds on inputs or gates may require
+    additional inputs (removed constant or identical features may be needed), or if the number of inputs
+    is not minimized (answers may contain redundant constant or identical inputs).
+
+    Parameters
+    ----------
+    gate_types : list
+        description of allowed gates (see classifier.csv2asp)
+    lower_bound_inputs : int
+        lower bound on number of inputs in classifier
+    lower_bound_gates : int
+        lower bound on number of gates in classifier
+    uniqueness_constraint : bool
+        if True inputs should be unique across the classifier
+    optimization_strategy : int
+        optimization strategy (see classifier.csv2asp)
+
+    Returns
+    -------
+    bool
+        True if features may be reduced
+
+    """
+
+    if uniqueness_constraint or optimization_strategy not in [1, 2, 3]:
+        return False
+    if lower_bound_inputs > 1 or lower_bound_gates > 1:
+        return False
+    for gate_type in gate_types:
+        if gate_type["LowerBoundPos"] > 0 or gate_type["LowerBoundNeg"] > 0:
+            return False
+
+    return True
+
+
+# remove constant features and merge identical (and complementary) features
+def reduce_features(data, merge_complements=False):
+
+    """
+
+    Removes constant features and merges features with identical values across all samples into
+    a single representative (the first of them). If merge_complements is True, features with complementary
+    values are merged as well (a positive input of a feature is a negative input of its complement).
+
+    Note, the reduction is valid only under some constraints (see reduction_allowed) and merging complements
+    only if gate types do not restrict signs of inputs (see sign_swaps_allowed), otherwise answers change.
+
+    Parameters
+    ----------
+    data : str or Dataset
+        name of input file or loaded data set
+    merge_complements : bool
+        if True merge complementary features
+
+    Returns
+    -------
+    reduced_data : Dataset
+        data set containing representatives only
+    reduction : FeatureReduction
+        mapping of removed features
+
+    """
+
+    data = dataset.load_dataset(data)
+    reduction = FeatureReduction()
+
+    # pack samples of each feature into bits, packed columns are used as keys
+    columns = numpy.packbits(data.matrix, axis=0).T
+    inverted = numpy.packbits(1 - data.matrix, axis=0).T
+
+    constant = numpy.zeros(len(data.features), dtype=bool)
+    if len(data.ids) != 0:
+        constant = data.matrix.min(axis=0) == data.matrix.max(axis=0)
+
+    seen = {}  # packed columns of representatives
+    kept = []
+    for i, feature in enumerate(data.features):
+        if constant[i]:
+            reduction.constants.append(feature)
+            continue
+
+        key = columns[i].tobytes()
+        complement_key = inverted[i].tobytes()
+        if key in seen:
+            reduction.duplicates.setdefault(seen[key], []).append(feature)
+        elif merge_complements and complement_key in seen:
+            reduction.complements.setdefault(seen[complement_key], []).append(feature)
+        else:
+            seen[key] = feature
+            kept.append(i)
+            reduction.representatives.append(feature)
+
+    reduced_data = dataset.Dataset(data.path, data.ids, data.annots, reduction.representatives,
+                                   data.matrix[:, kept], data.weights)
+
+    print("\nFEATURE REDUCTION")
+    print("Features before reduction: ", len(data.features))
+    print("Features after reduction: ", len(reduction.representatives))
+    print("Constant features: ", len(reduction.constants))
+    print("Identical features: ", sum(map(len, reduction.duplicates.values())))
+    print("Complementary features: ", sum(map(len, reduction.complements.values())))
+
+    return reduced_data, reduction
+
+
+# pack samples of features into 64-bit words
+def pack_columns(matrix):
+
+    """
+
+    Packs samples of each feature into bits of 64-bit words.
+
+    Parameters
+    ----------
+    matrix : numpy.ndarray
+        binary matrix (samples x features)
+
+    Returns
+    -------
+    numpy.ndarray
+        packed columns (features x words)
+
+    """
+
+    packed = numpy.packbits(numpy.asarray(matrix, dtype=bool), axis=0).T
+    padding = -packed.shape[1] % 8 or (8 if packed.shape[1] == 0 else 0)  # at least one word
+    packed = numpy.pad(packed, ((0, 0), (0, padding)))
+
+    return numpy.ascontiguousarray(packed).view(numpy.uint64)
+
+
+# find inputs that are not dominated by other inputs of the same sign
+def undominated_inputs(data, feasible_pos=None, feasible_neg=None):
+
+    """
+
+    Finds inputs (feature, sign) that are not dominated. An input A dominates an input B of the same sign
+    if A is fulfilled in a superset of cancer samples and in a subset of healthy samples in which B is
+    fulfilled. Replacing B by A in a gate never adds errors, both in CNF (disjunctive gates) and in DNF
+    (conjunctive gates). Of inputs fulfilled in the same samples, the first one is kept.
+
+    The replacement requires that the gate does not hold the dominating feature with the opposite sign
+    (inputs are unique for gates), so inputs must not be pruned if a gate type allows both signs.
+
+    Inputs are visited by decreasing number of cancer samples and increasing number of healthy samples,
+    so every dominating input is visited first and inputs are compared with kept inputs only.
+
+    Parameters
+    ----------
+    data : Dataset
+        data set
+    feasible_pos : numpy.ndarray
+        if given, only these features are candidates for positive inputs
+    feasible_neg : numpy.ndarray
+        if given, only these features are candidates for negative inputs
+
+    Returns
+    -------
+    kept_pos : numpy.ndarray
+        for each feature True if it is a not dominated positive input
+    kept_neg : numpy.ndarray
+        for each feature True if it is a not dominated negative input
+
+    """
+
+    cancer = data.matrix[data.annots != 0]  # samples annotated as cancer in the instance
+    healthy = data.matrix[data.annots == 0]
+
+    kept = []
+    for sign, candidates in ((1, feasible_pos), (0, feasible_neg)):
+        if candidates is None:
+            candidates = numpy.ones(len(data.features), dtype=bool)
+
+        cancer_words = pack_columns(cancer == sign)  # samples in which inputs are fulfilled
+        healthy_words = pack_columns(healthy == sign)
+        cancer_counts = (cancer == sign).sum(axis=0)
+        healthy_counts = (healthy == sign).sum(axis=0)
+
+        indices = numpy.flatnonzero(candidates)
+        order = indices[numpy.lexsort((indices, healthy_counts[indices], -cancer_counts[indices]))]
+
+        kept_sign = numpy.zeros(len(data.features), dtype=bool)
+        kept_cancer = numpy.empty((len(order), cancer_words.shape[1]), dtype=numpy.uint64)
+        kept_healthy = numpy.empty((len(order), healthy_words.shape[1]), dtype=numpy.uint64)
+        count = 0
+        for i in order.tolist():
+            # kept inputs fulfilled in all cancer samples of input i and in no other healthy samples,
+            # the first word rejects most of the kept inputs
+            rows = numpy.flatnonzero(((cancer_words[i, 0] & ~kept_cancer[:count, 0]) == 0)
+                                     & ((kept_healthy[:count, 0] & ~healthy_words[i, 0]) == 0))
+            covers = ((cancer_words[i] & ~kept_cancer[rows]) == 0).all(axis=1)
+            covers &= ((kept_healthy[rows] & ~healthy_words[i]) == 0).all(axis=1)
+            if not covers.any():
+                kept_sign[i] = True
+                kept_cancer[count] = cancer_words[i]
+                kept_healthy[count] = healthy_words[i]
+                count += 1
+
+        kept.append(kept_sign)
+
+    return kept[0], kept[1]
@@ -1,12 +1,10 @@
-import trainer
-
-
 # filter best performing solutions by total number of errors
-def filter_best_solutions(errors, solutions):
+def filter_best_solutions(errors, solutions, verbosity=1):
 
     """
 
-    Filters best solutions based on the total number of errors.
+    Filters best solutions based on the total number of errors. Solutions are not converted
+    (see trainer.Result) unless they are shown.
 
     Parameters
     ----------
@@ -14,6 +12,8 @@ def filter_best_solutions(errors, solutions):
         list of total numbers of errors for all results
     solutions : list
         list of solutions
+    verbosity : int
+        0 or 1 - number of solutions of each best result, 2 - all best solutions as well
 
     Returns
     -------
@@ -32,20 +32,19 @@ def filter_best_solutions(errors, solutions):
     for result in best_results:  # result may contain several solutions for particular number of errors in total
         print("\n##SUM: ", result.errors, "##")  # show total number of errors
         print("FP: ", result.fp, "FN: ", result.fn)  # show number of false positives and false negatives
-        print("Number of solutions: ", len(result.solutions_str))  # show number of solutions
+        print("Number of solutions: ", result.count())  # show number of solutions
+        if not result.optimal:
+            print("Solutions are not proven optimal (solver call interrupted).")
 
-        for solution in result.solutions_str:  # iterate over solutions in single ASP result
-            print(solution)  # show solutions
+        if verbosity >= 2:
+            for solution in result.solutions_str:  # iterate over solutions in single ASP result
+                print(solution)  # show solutions
 
     solution_list = []  # create empty solution list
 
     # create a list of single solutions (each result contains single solution)
     for result in best_results:
-        for i in range(0, len(result.solutions_str)):
-            # create single solution
-            single_solution = trainer.Result(result.solutions_str[i], result.solutions_by_gate[i], result.errors,
-                                             result.fp, result.fn, result.size)
-            solution_list.append(single_solution)  # add to solution list
+        solution_list.extend(result.split())  # add single solutions to solution list
 
     return solution_list
 
@@ -86,12 +85,35 @@ def filter_shortest_solutions(solutions):
     return shortest_solutions
 
 
+# compute canonical key of solution (equal for solutions that only differ in order of gates)
+def symmetry_key(solution):
+
+    """
+
+    Computes a canonical hashable key of a solution. Gates are sorted, inputs within gates are
+    sorted alphabetically already (see converter.convert_asp_results).
+
+    Parameters
+    ----------
+    solution : Result
+        single solution
+
+    Returns
+    -------
+    tuple
+        sorted tuple of gates, each gate is a tuple of inputs
+
+    """
+
+    return tuple(sorted(tuple(tuple(gate_input) for gate_input in gate) for gate in solution.solutions_by_gate))
+
+
 # remove symmetric solutions (that only differ in order of inputs and gates)
 def filter_symmetric_solutions(solutions):
 
     """
 
-    Filters symmetric solutions.
+    Filters symmetric solutions. The first of symmetric solutions is kept.
 
     Parameters
     ----------
@@ -109,20 +131,17 @@ def filter_symmetric_solutions(solutions):
     print("\n\n####################################################")
     print("############REMOVING SYMMETRIC SOLUTIONS############\n")
     print("Number of solutions before filtering: ", len(solution_list))
-    to_del = []  # list of ids of solutions to delete
-    for i in range(0, len(solution_list) - 1):
-        for j in range(i + 1, len(solution_list)):
-            # check equality of sorted solutions
-            # lists of gates and inputs are sorter alphabetically
-            if sorted(solution_list[i].solutions_by_gate) == sorted(solution_list[j].solutions_by_gate):
-                to_del.append(j)  # add id of solution to delete
 
-    to_del = list(set(to_del))  # remove repeating ids
-    to_del.sort(reverse=True)  # sort indices in descending order for removal
+    # keep solutions with canonical keys that were not seen yet
+    seen = set()
+    unique_solutions = []
+    for solution in solution_list:
+        key = symmetry_key(solution)
+        if key not in seen:
+            seen.add(key)
+            unique_solutions.append(solution)
 
-    # remove symmetrical solutions
-    for id in to_del:
-        del solution_list[id]
+    solution_list = unique_solutions
 
     print("Number of solutions after filtering: ", len(solution_list))
     for solution in solution_list:  # show unique solutions
@@ -132,3 +151,90 @@ def filter_symmetric_solutions(solutions):
 
     return solution_list
 
+
+# class for filtering a stream of solutions
+class StreamFilter:
+
+    """
+
+    Class filtering solutions one by one as they are found (see trainer.train_classifiers, on_classifier).
+    Only solutions with the lowest total number of errors, of these the shortest ones and the first of
+    symmetric solutions are kept, so the result is the same as of filter_best_solutions, filter_shortest_solutions
+    and filter_symmetric_solutions applied in this order. Solutions that are not kept are not stored.
+
+    Attributes
+    ----------
+    errors : int
+        lowest total number of errors seen (None if no solution was added)
+    size : int
+        size of the shortest solution with the lowest total number of errors
+    kept : dict
+        canonical keys (see symmetry_key) mapped to kept solutions (in the order they were added)
+    received : int
+        number of added solutions
+
+    Methods
+    -------
+    add(solution)
+        Adds a solution.
+    results()
+        Returns kept solutions.
+    """
+
+    def __init__(self):
+        self.errors = None  # lowest total number of errors
+        self.size = None  # size of the shortest solution
+        self.kept = {}  # kept solutions
+        self.received = 0  # number of added solutions
+
+    def add(self, solution):
+
+        """
+
+        Adds a solution (a Result with a single solution, see filter_best_solutions). Kept solutions are
+        dropped if the new solution has fewer errors in total or is shorter.
+
+        Parameters
+        ----------
+        solution : Result
+            single solution
+
+        """
+
+        self.received += 1
+        if self.errors is None or (solution.errors, solution.size) < (self.errors, self.size):
+            self.errors = solution.errors
+            self.size = solution.size
+            self.kept = {}
+        elif (solution.errors, solution.size) != (self.errors, self.size):
+            return
+
+        key = symmetry_key(solution)
+        if key not in self.kept:
+            self.kept[key] = solution
+
+    def results(self):
+
+        """
+
+        Returns kept solutions.
+
+        Returns
+        -------
+        list
+            list of solutions
+
+        """
+
+        print("\n\n##############################################")
+        print("############FILTERED SOLUTION STREAM############")
+        print("Number of received solutions: ", self.received)
+        print("Number of kept solutions: ", len(self.kept))
+        for solution in self.kept.values():  # show kept solutions
+            print("\n##SUM: ", solution.errors, "##")
+            print("FP: ", solution.fp, "FN: ", solution.fn)
+            if not solution.optimal:
+                print("Solutions are not proven optimal (solver call interrupted).")
+            print(solution.solutions_str)
+
+        return list(self.kept.values())
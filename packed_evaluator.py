@@ -0,0 +1,292 @@
+import numpy
+
+# number of set bits in every byte value (used if numpy.bitwise_count is not available)
+BIT_COUNTS = numpy.array([bin(i).count("1") for i in range(256)], dtype=numpy.uint8)
+
+
+# count set bits in packed array
+def count_bits(packed):
+
+    """
+
+    Counts set bits in a bit-packed array.
+
+    Parameters
+    ----------
+    packed : numpy.ndarray
+        bit-packed array (uint8)
+
+    Returns
+    -------
+    int
+        number of set bits
+
+    """
+
+    if hasattr(numpy, "bitwise_count"):
+        return int(numpy.bitwise_count(packed).sum())
+
+    return int(BIT_COUNTS[packed].sum())
+
+
+# class for bit-packed data set
+class PackedData:
+
+    """
+
+    Class representing a data set with bit-packed feature columns.
+
+    Each feature column is packed into bits (one bit per sample, numpy.packbits), so a gate may be evaluated
+    for all samples at once with bitwise operations.
+
+    Attributes
+    ----------
+    features : list
+        names of features
+    feature_index : dict
+        feature names mapped to column indices
+    ids : list
+        sample IDs
+    sample_count : int
+        number of samples
+    columns : numpy.ndarray
+        bit-packed columns (features x bytes), bit is set if feature is high (1) in the sample
+    valid : numpy.ndarray
+        bit-packed mask of existing samples (padding bits are not set)
+    cancer : numpy.ndarray
+        bit-packed mask of cancer samples (Annots = 1)
+    healthy : numpy.ndarray
+        bit-packed mask of healthy samples (Annots = 0)
+
+    Methods
+    -------
+    from_rows(miRNAs, rows)
+        Creates packed data from rows returned by classifier.csv2rows.
+    literal(feature, sign)
+        Returns packed samples in which an input fulfills its condition.
+    """
+
+    def __init__(self, features, ids, matrix, annots):
+        self.features = list(features)  # names of features
+        self.feature_index = {feature: i for i, feature in enumerate(self.features)}  # column of feature
+        self.ids = list(ids)  # sample IDs
+        self.sample_count = len(self.ids)  # number of samples
+
+        matrix = numpy.asarray(matrix, dtype=bool).reshape(self.sample_count, len(self.features))
+        annots = numpy.asarray(annots)
+
+        # pack samples of each feature into bits
+        self.columns = numpy.ascontiguousarray(numpy.packbits(matrix, axis=0).T)
+        self.valid = numpy.packbits(numpy.ones(self.sample_count, dtype=bool))
+        self.cancer = numpy.packbits(annots == 1)
+        self.healthy = numpy.packbits(annots == 0)
+
+    @classmethod
+    def from_rows(cls, miRNAs, rows):
+
+        """
+
+        Creates packed data from rows returned by classifier.csv2rows.
+
+        Parameters
+        ----------
+        miRNAs : list
+            names of features
+        rows : list
+            data
+
+        Returns
+        -------
+        PackedData
+            packed data
+
+        """
+
+        matrix = [[row[miRNA] == "1" for miRNA in miRNAs] for row in rows]
+        annots = [1 if row["Annots"] == "1" else 0 if row["Annots"] == "0" else -1 for row in rows]
+
+        return cls(miRNAs, [row["ID"] for row in rows], matrix, annots)
+
+    def literal(self, feature, sign):
+
+        """
+
+        Returns packed samples in which an input fulfills its condition (positive - feature is high,
+        negative - feature is low).
+
+        Parameters
+        ----------
+        feature : str
+            name of feature
+        sign : str
+            positive or negative
+
+        Returns
+        -------
+        numpy.ndarray
+            bit-packed samples
+
+        """
+
+        column = self.columns[self.feature_index[feature]]
+        if sign == "positive":
+            return column
+
+        return ~column & self.valid
+
+
+# parse classifier written as gate_input predicates
+def parse_gate_inputs(gate_inputs):
+
+    """
+
+    Parses a classifier written as gate_input predicates to a list of gates.
+
+    Parameters
+    ----------
+    gate_inputs : str
+        classifier, e.g., gate_input(1,positive,g189) gate_input(1,positive,g224) gate_input(2,negative,g31)
+
+    Returns
+    -------
+    list
+        list of gates, each gate is a list of (feature, sign) inputs
+
+    """
+
+    gate_inputs = gate_inputs.replace(".", "").split()
+    gate_inputs = [x[x.find("(") + 1:-1].split(",") for x in gate_inputs]
+
+    gates = {}
+    for gate_id, sign, feature in gate_inputs:
+        gates.setdefault(gate_id, []).append((feature, sign))
+
+    return list(gates.values())
+
+
+# evaluate gate for all samples
+def evaluate_gate(data, gate, boolean_function_form=0):
+
+    """
+
+    Evaluates a gate for all samples.
+
+    Parameters
+    ----------
+    data : PackedData
+        packed data
+    gate : list
+        list of (feature, sign) inputs
+    boolean_function_form : int
+        - 0: Conjunctive Normal Form (CNF), gate is a disjunction of inputs
+        - 1: Disjunctive Normal Form (DNF), gate is a conjunction of inputs
+
+    Returns
+    -------
+    numpy.ndarray
+        bit-packed samples in which the gate fires
+
+    """
+
+    if boolean_function_form == 0:
+        fires = numpy.zeros_like(data.valid)
+        for feature, sign in gate:
+            fires |= data.literal(feature, sign)
+    else:
+        fires = data.valid.copy()
+        for feature, sign in gate:
+            fires &= data.literal(feature, sign)
+
+    return fires
+
+
+# evaluate classifier for all samples
+def evaluate(data, gates, boolean_function_form=0, gate_cache=None):
+
+    """
+
+    Evaluates a classifier for all samples at once.
+
+    Parameters
+    ----------
+    data : PackedData
+        packed data
+    gates : list or str
+        list of gates (lists of (feature, sign) inputs) or classifier written as gate_input predicates
+    boolean_function_form : int
+        - 0: Conjunctive Normal Form (CNF)
+        - 1: Disjunctive Normal Form (DNF)
+    gate_cache : dict
+        if given, evaluated gates are stored and reused
+
+    Returns
+    -------
+    false_neg : int
+        number of false negative errors
+    false_pos : int
+        number of false positive errors
+    predictions : numpy.ndarray
+        prediction for each sample (True - cancer, False - healthy)
+
+    """
+
+    if isinstance(gates, str):
+        gates = parse_gate_inputs(gates)
+
+    if boolean_function_form == 0:
+        prediction = data.valid.copy()  # conjunction of gates
+    else:
+        prediction = numpy.zeros_like(data.valid)  # disjunction of gates
+
+    for gate in gates:
+        if gate_cache is not None:
+            key = frozenset(gate)
+            if key not in gate_cache:
+                gate_cache[key] = evaluate_gate(data, gate, boolean_function_form)
+            fires = gate_cache[key]
+        else:
+            fires = evaluate_gate(data, gate, boolean_function_form)
+
+        if boolean_function_form == 0:
+            prediction &= fires
+        else:
+            prediction |= fires
+
+    false_neg = count_bits(data.cancer & ~prediction)
+    false_pos = count_bits(data.healthy & prediction)
+    predictions = numpy.unpackbits(prediction, count=data.sample_count).astype(bool)
+
+    return false_neg, false_pos, predictions
+
+
+# evaluate many classifiers on the same data
+def evaluate_many(data, classifiers, boolean_function_form=0):
+
+    """
+
+    Evaluates many classifiers on the same packed data. Gates shared by classifiers are evaluated once.
+
+    Parameters
+    ----------
+    data : PackedData
+        packed data
+    classifiers : list
+        list of classifiers (lists of gates or gate_input predicates)
+    boolean_function_form : int
+        - 0: Conjunctive Normal Form (CNF)
+        - 1: Disjunctive Normal Form (DNF)
+
+    Returns
+    -------
+    list
+        list of (false_neg, false_pos) pairs
+
+    """
+
+    gate_cache = {}
+    scores = []
+    for gates in classifiers:
+        false_neg, false_pos, predictions = evaluate(data, gates, boolean_function_form, gate_cache)
+        scores.append((false_neg, false_pos))
+
+    return scores
@@ -0,0 +1,167 @@
+import hashlib
+import json
+import os
+import sqlite3
+from contextlib import closing
+import numpy
+import solver
+
+
+# compute key of instance, program and solver settings
+def program_key(instance, program, options, data=None, data_encoding="dense"):
+
+    """
+
+    Computes a key of a solved program based on the instance, the program, clasp options and data facts
+    added through the solver backend.
+
+    Parameters
+    ----------
+    instance : str or ProgramFile
+        ASP instance (a file is read in blocks, see solver.ProgramFile)
+    program : str or ProgramFile
+        ASP program
+    options : str
+        clasp options
+    data : Dataset
+        data set added as facts through the clingo backend (None - data facts are part of the instance)
+    data_encoding : str
+        values of miRNA data added as facts (see classifier.stored_values)
+
+    Returns
+    -------
+    str
+        key of the program
+
+    """
+
+    digest = hashlib.sha1()
+    for part in [instance, program, options]:
+        if isinstance(part, solver.ProgramFile):
+            with open(part.path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+        else:
+            digest.update(part.encode())
+        digest.update(b"\0")
+
+    if data is not None:
+        digest.update(json.dumps([data.ids, data.features, data_encoding]).encode())
+        digest.update(numpy.ascontiguousarray(data.annots).tobytes())
+        digest.update(numpy.ascontiguousarray(data.matrix).tobytes())
+        if data.weights is not None:
+            digest.update(numpy.ascontiguousarray(data.weights).tobytes())
+
+    return digest.hexdigest()
+
+
+# class for on-disk cache of solver results
+class ResultCache:
+
+    """
+
+    Class representing an on-disk cache of solver results for cells of the relaxation grid (SQLite database
+    in the cache directory). Results are keyed by the key of the program (see program_key) and bounds on errors,
+    so a changed instance, program or option never returns a stale result.
+
+    Interrupted cells (TIMEOUT, FEASIBLE) are stored with their time limit and returned only to solver calls
+    that do not have more time.
+
+    Attributes
+    ----------
+    path : str
+        database file
+    key : str
+        key of the program
+    hits : int
+        number of results returned from the cache
+
+    Methods
+    -------
+    get(fp, fn, time_limit=None)
+        Returns the cached result of a cell.
+    put(fp, fn, status, solutions, time_limit=None)
+        Stores the result of a cell.
+    """
+
+    def __init__(self, cache_dir, instance, program, options, data=None, data_encoding="dense"):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, "results.sqlite")  # database file
+        self.key = program_key(instance, program, options, data, data_encoding)  # key of the program
+        self.hits = 0  # number of cached results returned
+
+        with closing(self._connect()) as connection, connection:
+            connection.execute("CREATE TABLE IF NOT EXISTS results (program TEXT, fp INTEGER, fn INTEGER, "
+                               "status TEXT, time_limit REAL, solutions TEXT, PRIMARY KEY (program, fp, fn))")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=60)
+
+    def get(self, fp, fn, time_limit=None):
+
+        """
+
+        Returns the cached result of a cell.
+
+        Parameters
+        ----------
+        fp : int
+            number of allowed false positive errors
+        fn : int
+            number of allowed false negative errors
+        time_limit : float
+            time limit of the solver call in seconds (None - no limit)
+
+        Returns
+        -------
+        tuple
+            (status, solutions) of the cell, None if the result is not cached (or the cached call was interrupted
+            and the new call has more time)
+
+        """
+
+        with closing(self._connect()) as connection:
+            row = connection.execute("SELECT status, time_limit, solutions FROM results "
+                                     "WHERE program = ? AND fp = ? AND fn = ?", (self.key, fp, fn)).fetchone()
+
+        if row is None:
+            return None
+
+        status, cached_limit, solutions = row
+        if status in [solver.TIMEOUT, solver.FEASIBLE]:
+            # more time may give a different result
+            if time_limit is None or cached_limit is None or time_limit > cached_limit:
+                return None
+
+        self.hits += 1
+        answers = [frozenset((predicate, tuple(args)) for predicate, args in answer)
+                   for answer in json.loads(solutions)]
+
+        return status, answers
+
+    def put(self, fp, fn, status, solutions, time_limit=None):
+
+        """
+
+        Stores the result of a cell.
+
+        Parameters
+        ----------
+        fp : int
+            number of allowed false positive errors
+        fn : int
+            number of allowed false negative errors
+        status : str
+            status of the solver call
+        solutions : list
+            list of answers (formatted as returned by Clyngor)
+        time_limit : float
+            time limit of the solver call in seconds (None - no limit)
+
+        """
+
+        answers = json.dumps([[[predicate, list(args)] for predicate, args in answer] for answer in solutions])
+
+        with closing(self._connect()) as connection, connection:
+            connection.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)",
+                               (self.key, fp, fn, status, time_limit, answers))
@@ -1,14 +1,17 @@
 import time
 import sys
-from clyngor import solve
 import ASP_prog_generator
+import dataset
+import result_cache
+import solver
 import argparse
 import trainer
 import converter
 import filter
 
 
-def optimize_rules(instance, program, fp_max, fn_max):
+def optimize_rules(instance, program, fp_max, fn_max, backend="clyngor", data=None, data_encoding="dense",
+                   solver_settings=None, result_cache_dir=None, verbosity=1):
 
     """
 
@@ -16,14 +19,26 @@ def optimize_rules(instance, program, fp_max, fn_max):
 
     Parameters
     ----------
-    instance : str
-        instance
+    instance : str or ProgramFile
+        instance (a file is read by the solver, see solver.ProgramFile)
     program : str
         program
     fp_max : int
         upper bound on false positives
     fn_max : int
         upper bound on false negatives
+    backend : str
+        solver backend (clyngor or clingo)
+    data : Dataset
+        if given, tissue and miRNA data are added as facts through the clingo backend
+    data_encoding : str
+        values of miRNA data written as facts (see classifier.stored_values)
+    solver_settings : SolverSettings
+        settings of clasp (None - default settings, see solver.SolverSettings)
+    result_cache_dir : str
+        directory of the on-disk cache of solver results (None - no cache, not used with a time limit)
+    verbosity : int
+        0 - filtered rules only, 1 - number of found rules as well, 2 - all found rules as well
 
     """
 
@@ -32,29 +47,44 @@ def optimize_rules(instance, program, fp_max, fn_max):
 
     constraints = \
         "\n".join(["upper_bound_falsepos(" + str(fp_max) + ").", "upper_bound_falseneg(" + str(fn_max) + ")."])
-    asp_program = instance + constraints + program  # add constraints to the instance and the program
-
-    opt = '--opt-mode=optN'  # add clasp option - return all optimal models
-    answers = solve(inline=asp_program, options=opt)  # solve program
-
-    #  '--quiet=1' option does not work with clyngor
-    #  answers.with_optimality returns information about optimality of answers
-    solutions = []
-    for answer in answers.with_optimality:
-        if answer[2] is True:  # if solution is optimal
-            solutions.append(list(answer)[0])  # ad solutions to solution list
+    asp_program = [instance, constraints, program]  # add constraints to the instance and the program
+
+    if solver_settings is None:
+        solver_settings = solver.SolverSettings()
+    opt = solver_settings.options()  # clasp options, all optimal models are returned
+    print("Solver options: ", opt)
+
+    if solver_settings.time_limit is not None and backend != "clingo":
+        print("Time limit of solver calls requires in-process solving, switching to the clingo backend.")
+        backend = "clingo"
+
+    cache = None
+    cached = None
+    if result_cache_dir is not None and solver_settings.time_limit is None:  # interrupted calls are not stored
+        cache = result_cache.ResultCache(result_cache_dir, instance, program, opt, data, data_encoding)
+        cached = cache.get(fp_max, fn_max)
+
+    if cached is not None:  # program was solved by an earlier run
+        print("Cached: FP: ", fp_max, " FN: ", fn_max, " STATUS:", cached[0])
+        status, solutions = cached
+    else:
+        status, solutions = solver.solve_program(asp_program, opt, backend, data, data_encoding,
+                                                 solver_settings.time_limit)  # solve program
+        if cache is not None:
+            cache.put(fp_max, fn_max, status, solutions)
 
     returned_results = []
     errors = []
 
-    if len(solutions) != 0:  # if solutions were found
-        new_result = trainer.Result(solutions, [], fp_max + fn_max, fp_max, fn_max, 0)  # create new result
+    if len(solutions) != 0:  # if solutions were found (the best model found so far if the call was interrupted)
+        new_result = trainer.Result(solutions, [], fp_max + fn_max, fp_max, fn_max, 0,
+                                    status != solver.FEASIBLE)  # create new result
         errors.append(fp_max + fn_max)
         returned_results.append(new_result)  # note, one result may contain several solutions!
 
     # convert asp results to string and lists
-    returned_results = converter.convert_asp_results(returned_results)
-    solution_list = filter.filter_best_solutions(errors, returned_results)
+    returned_results = converter.convert_asp_results(returned_results, verbosity)
+    solution_list = filter.filter_best_solutions(errors, returned_results, verbosity)
     solutions = filter.filter_symmetric_solutions(solution_list)
 
     solution_counter = 0
@@ -113,6 +143,40 @@ def arg_parser():
                         help='Constraints for ASP program.')
     parser.add_argument('--max_fp', dest='fp_max', type=int, default=0, help='Upper bound on false positives.')
     parser.add_argument('--max_fn', dest='fn_max', type=int, default=0, help='Upper bound on false negatives.')
+    parser.add_argument('--dataset_cache', dest='dataset_cache', type=str, default=None,
+                        help='Directory of the on-disk cache of parsed data sets.')
+    parser.add_argument('--backend', dest='backend', type=str, default='clyngor', choices=['clyngor', 'clingo'],
+                        help='Solver backend: clyngor (ASP text) or clingo (data facts are added in-process '
+                             'through the clingo Python API).')
+    parser.add_argument('--deduplicate_samples', dest='deduplicate_samples', action='store_true', default=False,
+                        help='Merge samples with identical profiles and annotations, errors are counted as '
+                             'weighted sums.')
+    parser.add_argument('--data_encoding', dest='data_encoding', type=str, default='dense',
+                        choices=['dense', 'high', 'minority'],
+                        help='miRNA data written as facts: dense (high and low values), high (high values only) or '
+                             'minority (less frequent value of each feature only).')
+    parser.add_argument('--prune_dominated', dest='prune_dominated', action='store_true', default=False,
+                        help='Remove inputs dominated by other inputs of the same sign from candidates for gate '
+                             'inputs (at least one optimal classifier is kept).')
+    parser.add_argument('--result_cache', dest='result_cache', type=str, default=None,
+                        help='Directory of the on-disk cache of solver results.')
+    parser.add_argument('--threads', dest='threads', type=int, default=None,
+                        help='Number of solver threads (overrides Threads of the constraints file).')
+    parser.add_argument('--parallel_mode', dest='parallel_mode', type=str, default=None, choices=['compete', 'split'],
+                        help='Parallel mode of solver threads: compete or split (overrides ParallelMode of the '
+                             'constraints file).')
+    parser.add_argument('--configuration', dest='configuration', type=str, default=None,
+                        help='Clasp configuration preset, e.g., auto, frumpy, jumpy, tweety, handy, crafty, trendy '
+                             'or many (overrides Configuration of the constraints file).')
+    parser.add_argument('--time_limit', dest='time_limit', type=float, default=None,
+                        help='Maximal time in seconds of the solver call (overrides TimeLimit of the constraints '
+                             'file).')
+    parser.add_argument('--model_limit', dest='model_limit', type=int, default=None,
+                        help='Maximal number of optimal models returned by the solver call, 0 - all (overrides '
+                             'ModelLimit of the constraints file).')
+    parser.add_argument('--verbosity', dest='verbosity', type=int, default=1, choices=[0, 1, 2],
+                        help='Output of found rules: 0 - filtered rules only, 1 - number of found rules, '
+                             '2 - all found rules.')
 
     params = parser.parse_args()
 
@@ -139,12 +203,25 @@ def run_rule_optimizer():
             print("ERROR: ASP constraints file not given.")
             sys.exit(0)
         else:
+            train_data = dataset.load_dataset(params.train_data, params.dataset_cache)  # parse train data set once
+            if params.deduplicate_samples:  # merge identical samples
+                train_data = train_data.deduplicated()
+            data_facts = params.backend == "clyngor"  # clingo backend adds data facts in-process
             instance, program = \
-                ASP_prog_generator.create_asp_prog(params.train_data, params.constr)  # generate ASP program
+                ASP_prog_generator.create_asp_prog(train_data, params.constr, data_facts=data_facts,
+                                                   data_encoding=params.data_encoding,
+                                                   prune_dominated=params.prune_dominated)  # generate ASP program
+            solver_settings = \
+                ASP_prog_generator.read_solver_settings(params.constr, threads=params.threads,
+                                                        parallel_mode=params.parallel_mode,
+                                                        configuration=params.configuration,
+                                                        time_limit=params.time_limit,
+                                                        model_limit=params.model_limit)
         fp_max = params.fp_max  # upper bound on false positives allowed in training
         fn_max = params.fn_max  # upper bound on false negatives allowed in training
 
-    optimize_rules(instance, program, fp_max, fn_max)
+    optimize_rules(instance, program, fp_max, fn_max, params.backend, None if data_facts else train_data,
+                   params.data_encoding, solver_settings, params.result_cache, params.verbosity)
 
     end_train = time.time()
     training_time = end_train - start_train
@@ -4,6 +4,8 @@ from datetime import datetime
 import time
 
 import ASP_prog_generator
+import dataset
+import feature_reducer
 import trainer
 import filter
 import evaluator
@@ -37,11 +39,66 @@ def arg_parser():
     parser.add_argument('--test_n', dest='test_n', type=int, default=None,
                         help='Number of negative samples in test data.')
     parser.add_argument('--max_time', dest='max_time', type=int, default=None,
-                        help='Maximal time in seconds.')
+                        help='Maximal time in seconds (split among remaining bounds on errors and enforced during '
+                             'solving).')
     parser.add_argument('--min_fp', dest='fp_min', type=int, default=0, help='Lower bound on false positives.')
     parser.add_argument('--min_fn', dest='fn_min', type=int, default=0, help='Lower bound on false negatives.')
     parser.add_argument('--max_fp', dest='fp_max', type=int, default=0, help='Upper bound on false positives.')
     parser.add_argument('--max_fn', dest='fn_max', type=int, default=0, help='Upper bound on false negatives.')
+    parser.add_argument('--incremental', dest='incremental', action='store_true', default=False,
+                        help='Ground instance and program once and only change bounds on errors between solver calls '
+                             '(grounded again when a bound is tightened).')
+    parser.add_argument('--jobs', dest='jobs', type=int, default=1,
+                        help='Number of worker processes solving bounds on errors in parallel.')
+    parser.add_argument('--cell_timeout', dest='cell_timeout', type=float, default=None,
+                        help='Maximal time in seconds of solving single bounds on errors (overrides TimeLimit '
+                             'of the constraints file, default 300 seconds in worker processes).')
+    parser.add_argument('--threads', dest='threads', type=int, default=None,
+                        help='Number of solver threads (overrides Threads of the constraints file).')
+    parser.add_argument('--parallel_mode', dest='parallel_mode', type=str, default=None, choices=['compete', 'split'],
+                        help='Parallel mode of solver threads: compete or split (overrides ParallelMode of the '
+                             'constraints file).')
+    parser.add_argument('--configuration', dest='configuration', type=str, default=None,
+                        help='Clasp configuration preset, e.g., auto, frumpy, jumpy, tweety, handy, crafty, trendy '
+                             'or many (overrides Configuration of the constraints file).')
+    parser.add_argument('--model_limit', dest='model_limit', type=int, default=None,
+                        help='Maximal number of optimal models returned by a single solver call, 0 - all (overrides '
+                             'ModelLimit of the constraints file).')
+    parser.add_argument('--search_order', dest='search_order', type=str, default='grid', choices=['grid', 'diagonal'],
+                        help='Order of bounds on errors: grid (all bounds) or diagonal (by increasing total number '
+                             'of errors, stops after the first total number of errors with solutions).')
+    parser.add_argument('--prune', dest='prune', action='store_true', default=False,
+                        help='Do not solve bounds on errors implied to be unsatisfiable by already solved bounds.')
+    parser.add_argument('--dataset_cache', dest='dataset_cache', type=str, default=None,
+                        help='Directory of the on-disk cache of parsed data sets.')
+    parser.add_argument('--result_cache', dest='result_cache', type=str, default=None,
+                        help='Directory of the on-disk cache of solver results (bounds on errors solved by earlier '
+                             'runs with the same instance, program and solver options are not solved again).')
+    parser.add_argument('--backend', dest='backend', type=str, default='clyngor', choices=['clyngor', 'clingo'],
+                        help='Solver backend: clyngor (ASP text) or clingo (data facts are added in-process '
+                             'through the clingo Python API).')
+    parser.add_argument('--deduplicate_samples', dest='deduplicate_samples', action='store_true', default=False,
+                        help='Merge samples with identical profiles and annotations, errors are counted as '
+                             'weighted sums.')
+    parser.add_argument('--data_encoding', dest='data_encoding', type=str, default='dense',
+                        choices=['dense', 'high', 'minority'],
+                        help='miRNA data written as facts: dense (high and low values), high (high values only) or '
+                             'minority (less frequent value of each feature only).')
+    parser.add_argument('--prune_dominated', dest='prune_dominated', action='store_true', default=False,
+                        help='Remove inputs dominated by other inputs of the same sign from candidates for gate '
+                             'inputs (at least one optimal classifier is kept).')
+    parser.add_argument('--stream', dest='stream', action='store_true', default=False,
+                        help='Filter classifiers one by one as soon as they are found instead of collecting all '
+                             'optimal classifiers first (only the best classifiers are kept in memory).')
+    parser.add_argument('--reduce_features', dest='reduce_features', action='store_true', default=False,
+                        help='Remove constant features and merge identical features before training '
+                             '(found classifiers are expanded to all equivalent features, not applied if inputs '
+                             'must be unique, lower bounds require additional inputs or inputs are not minimized).')
+    parser.add_argument('--merge_complements', dest='merge_complements', action='store_true', default=False,
+                        help='Merge complementary features as well (requires --reduce_features).')
+    parser.add_argument('--verbosity', dest='verbosity', type=int, default=1, choices=[0, 1, 2],
+                        help='Output of found classifiers: 0 - filtered classifiers only, 1 - numbers of classifiers '
+                             'found for bounds on errors, 2 - all classifiers found for bounds on errors.')
 
     params = parser.parse_args()
 
@@ -71,8 +128,31 @@ def run_trainer():
             print("ERROR: ASP constraint file not given.")
             sys.exit(0)
         else:
+            train_data = dataset.load_dataset(params.train_data, params.dataset_cache)  # parse train data set once
+            reduction = None
+            if params.reduce_features and not ASP_prog_generator.features_reducible(params.constr):
+                # a merged or removed feature may be needed, e.g., if inputs must be unique
+                print("Features are not reduced (constraints may require identical or constant features).")
+                params.reduce_features = False
+            if params.merge_complements and not ASP_prog_generator.complements_mergeable(params.constr):
+                # a complementary feature replaces a merged feature with the opposite sign
+                print("Complementary features are not merged (gate types restrict signs of inputs).")
+                params.merge_complements = False
+            if params.reduce_features:  # merge equivalent features
+                train_data, reduction = feature_reducer.reduce_features(train_data, params.merge_complements)
+            if params.deduplicate_samples:  # merge identical samples
+                train_data = train_data.deduplicated()
+            data_facts = params.backend == "clyngor"  # clingo backend adds data facts in-process
             instance, program = \
-                ASP_prog_generator.create_asp_prog(params.train_data, params.constr)  # generate ASP program
+                ASP_prog_generator.create_asp_prog(train_data, params.constr, data_facts=data_facts,
+                                                   data_encoding=params.data_encoding,
+                                                   prune_dominated=params.prune_dominated)  # generate ASP program
+            solver_settings = \
+                ASP_prog_generator.read_solver_settings(params.constr, threads=params.threads,
+                                                        parallel_mode=params.parallel_mode,
+                                                        configuration=params.configuration,
+                                                        time_limit=params.cell_timeout,
+                                                        model_limit=params.model_limit)
         test_data = params.test_data  # test data set
         max_time = params.max_time
         fp_min = params.fp_min  # lower bound on false positives allowed in training
@@ -97,18 +177,53 @@ def run_trainer():
         print("Min FN: ", params.fn_min)
         print("Max FP: ", params.fp_max)
         print("Max FN: ", params.fn_max)
+        print("Max time: ", params.max_time)
+        print("Incremental solving: ", params.incremental)
+        print("Jobs: ", params.jobs)
+        print("Cell timeout: ", solver_settings.time_limit)
+        print("Solver threads: ", solver_settings.threads)
+        print("Parallel mode: ", solver_settings.parallel_mode)
+        print("Solver configuration: ", solver_settings.configuration)
+        print("Model limit: ", solver_settings.model_limit)
+        print("Search order: ", params.search_order)
+        print("Pruning: ", params.prune)
+        print("Data set cache: ", params.dataset_cache)
+        print("Result cache: ", params.result_cache)
+        print("Solver backend: ", params.backend)
+        print("Feature reduction: ", params.reduce_features)
+        print("Merging complementary features: ", params.merge_complements)
+        print("Sample deduplication: ", params.deduplicate_samples)
+        print("Data encoding: ", params.data_encoding)
+        print("Pruning dominated inputs: ", params.prune_dominated)
+        print("Streaming classifiers: ", params.stream)
+        print("Verbosity: ", params.verbosity)
+
+        # filter classifiers as soon as they are found
+        stream_filter = filter.StreamFilter() if params.stream else None
 
         # train classifiers
         errors, found_solutions = \
-            trainer.train_classifiers(instance, program, fp_min, fn_min, fp_max, fn_max, max_time, start_train)
-        # filter best found solutions by total number of errors
-        solution_list = filter.filter_best_solutions(errors, found_solutions)
-        # filter shortest classifiers
-        shortest_classifiers = filter.filter_shortest_solutions(solution_list)
-        # filter symmetric classifiers (that only differ in order of inputs and gates)
-        best_results = filter.filter_symmetric_solutions(shortest_classifiers)
+            trainer.train_classifiers(instance, program, fp_min, fn_min, fp_max, fn_max, max_time, start_train,
+                                      incremental=params.incremental, jobs=params.jobs,
+                                      cell_timeout=solver_settings.time_limit, search_order=params.search_order,
+                                      prune=params.prune, backend=params.backend,
+                                      data=None if data_facts else train_data, reduction=reduction,
+                                      data_encoding=params.data_encoding, solver_settings=solver_settings,
+                                      on_classifier=None if stream_filter is None else stream_filter.add,
+                                      result_cache_dir=params.result_cache, verbosity=params.verbosity)
+        if stream_filter is not None:
+            # best, shortest and not symmetric classifiers
+            best_results = stream_filter.results()
+        else:
+            # filter best found solutions by total number of errors
+            solution_list = filter.filter_best_solutions(errors, found_solutions, params.verbosity)
+            # filter shortest classifiers
+            shortest_classifiers = filter.filter_shortest_solutions(solution_list)
+            # filter symmetric classifiers (that only differ in order of inputs and gates)
+            best_results = filter.filter_symmetric_solutions(shortest_classifiers)
         # test classifiers on test data if available or show training results
         if test_data is not None and len(list(best_results)) != 0:
+            test_data = dataset.load_dataset(test_data, params.dataset_cache)  # parse test data set once
             evaluator.test_classifiers(best_results, test_data,
                                      train_positives, train_negatives,
                                      test_positives, test_negatives)
@@ -0,0 +1,660 @@
+import shlex
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import clingo
+import numpy
+from clyngor import solve
+from clyngor.utils import clingo_symbol_as_python_value
+import classifier
+
+# status of a single solver call
+SAT = "SAT"  # solutions were found
+UNSAT = "UNSAT"  # no solutions exist
+TIMEOUT = "TIMEOUT"  # solver call was interrupted
+FEASIBLE = "FEASIBLE"  # solver call was interrupted, the best model found is not proven optimal
+
+
+# solver backends
+BACKENDS = ["clyngor", "clingo"]
+
+# clasp parallel modes
+PARALLEL_MODES = ["compete", "split"]
+
+# default max time of a single cell solved in a worker process in seconds
+CELL_TIME_LIMIT = 300
+
+
+# class for a part of an ASP program stored in a file
+class ProgramFile:
+
+    """
+
+    Class representing a part of an ASP program stored in a file, e.g., the instance and the program written
+    to an .asp file as they are generated (see ASP_prog_generator.create_asp_prog). The solver reads the file
+    itself, so the part is not kept in memory as a string.
+
+    Attributes
+    ----------
+    path : str
+        name of the file
+    """
+
+    def __init__(self, path):
+        self.path = path  # name of the file
+
+
+# split ASP program into parts given as text and parts stored in files
+def split_parts(asp_program):
+
+    """
+
+    Splits an ASP program into parts given as text and parts stored in files.
+
+    Parameters
+    ----------
+    asp_program : str, ProgramFile or list
+        ASP program or a list of its parts
+
+    Returns
+    -------
+    texts : list
+        parts given as text
+    files : list
+        names of files of parts stored in files
+
+    """
+
+    parts = asp_program if isinstance(asp_program, list) else [asp_program]
+    texts = [part for part in parts if not isinstance(part, ProgramFile)]
+    files = [part.path for part in parts if isinstance(part, ProgramFile)]
+
+    return texts, files
+
+
+# class for settings of solver calls
+class SolverSettings:
+
+    """
+
+    Class representing settings of clasp passed to every solver call ([SOLVER] section of constraints file).
+
+    Attributes
+    ----------
+    threads : int
+        number of solver threads
+    parallel_mode : str
+        - compete: threads solve the whole problem (with different configurations)
+        - split: threads solve parts of the search space
+    configuration : str
+        clasp configuration preset, e.g., auto, frumpy, jumpy, tweety, handy, crafty, trendy or many
+        (None - clasp default)
+    time_limit : float
+        max time of a single solver call in seconds (None - no limit)
+    model_limit : int
+        max number of optimal models returned by a single solver call (0 - all)
+    project : bool
+        if True models are projected on #project atoms, e.g., classifiers without gate ids (see classifier.csv2asp)
+
+    Methods
+    -------
+    options()
+        Returns clasp options.
+    """
+
+    def __init__(self, threads=1, parallel_mode="compete", configuration=None, time_limit=None, model_limit=0,
+                 project=False):
+        if threads < 1:
+            raise ValueError("Number of solver threads must be at least 1.")
+        if parallel_mode not in PARALLEL_MODES:
+            raise ValueError("Unknown parallel mode: %s" % parallel_mode)
+        if model_limit < 0:
+            raise ValueError("Model limit must not be negative.")
+
+        self.threads = threads  # number of solver threads
+        self.parallel_mode = parallel_mode  # compete or split
+        self.configuration = configuration  # configuration preset
+        self.time_limit = time_limit  # max time of a solver call
+        self.model_limit = model_limit  # max number of optimal models
+        self.project = project  # projection on #project atoms
+
+    def options(self):
+
+        """
+
+        Returns clasp options (all optimal models are returned, see --opt-mode=optN).
+
+        Returns
+        -------
+        str
+            clasp options
+
+        """
+
+        options = ["--opt-mode=optN"]
+        if self.threads > 1:
+            options.append("--parallel-mode=%i,%s" % (self.threads, self.parallel_mode))
+        if self.configuration is not None:
+            options.append("--configuration=%s" % self.configuration)
+        if self.model_limit != 0:
+            options.append("--models=%i" % self.model_limit)
+        if self.project:
+            options.append("--project")
+
+        return " ".join(options)
+
+
+# split number of models from clasp options
+def split_model_limit(options):
+
+    """
+
+    Splits the number of models (--models, -n) from clasp options (Clyngor sets the number of models itself).
+
+    Parameters
+    ----------
+    options : str
+        clasp options
+
+    Returns
+    -------
+    options : str
+        clasp options without the number of models
+    model_limit : int
+        number of models (0 - all)
+
+    """
+
+    arguments = shlex.split(options)
+    model_limit = 0
+    rest = []
+    i = 0
+    while i < len(arguments):
+        argument = arguments[i]
+        if argument.startswith("--models="):
+            model_limit = int(argument[len("--models="):])
+        elif argument in ["--models", "-n"] and i + 1 < len(arguments):
+            model_limit = int(arguments[i + 1])
+            i += 1
+        else:
+            rest.append(argument)
+        i += 1
+
+    return " ".join(rest), model_limit
+
+
+# add tissue and miRNA data to solver session as facts
+def add_data_facts(control, data, data_encoding="dense"):
+
+    """
+
+    Adds tissue/2, data/3 (and tissue_weight/2, sparse_value/2) facts of a data set directly to a solver session
+    (through the clingo backend), so the facts are neither written as ASP text nor parsed. Facts must be added
+    before the program.
+
+    Parameters
+    ----------
+    control : clingo.Control
+        solver session
+    data : Dataset
+        data set
+    data_encoding : str
+        values of miRNA data added as facts (see classifier.stored_values)
+
+    """
+
+    ids = [clingo.parse_term(sample_id) for sample_id in data.ids]  # same terms as in ASP text
+    miRNAs = [clingo.parse_term(miRNA) for miRNA in data.features]
+    tissues = (clingo.Function("cancer"), clingo.Function("healthy"))
+    levels = (clingo.Function("low"), clingo.Function("high"))
+
+    function = clingo.Function
+    with control.backend() as backend:
+        add_atom = backend.add_atom
+        add_rule = backend.add_rule
+
+        for sample_id, annot in zip(ids, data.annots.tolist()):
+            add_rule([add_atom(function("tissue", [sample_id, tissues[annot == 0]]))])
+
+        if data.weights is not None:  # number of merged samples
+            for sample_id, weight in zip(ids, data.weights.tolist()):
+                add_rule([add_atom(function("tissue_weight", [sample_id, clingo.Number(weight)]))])
+
+        stored = classifier.stored_values(data, data_encoding)
+        if stored is None:
+            for sample_id, values in zip(ids, data.matrix.tolist()):
+                for miRNA, value in zip(miRNAs, values):
+                    add_rule([add_atom(function("data", [sample_id, miRNA, levels[value]]))])
+        else:
+            stored_levels = [levels[high] for high in stored.tolist()]
+            for miRNA, level in zip(miRNAs, stored_levels):
+                add_rule([add_atom(function("sparse_value", [miRNA, level]))])
+            for sample_id, values in zip(ids, data.matrix):
+                for i in numpy.flatnonzero(values == stored).tolist():  # features with stored values in the sample
+                    add_rule([add_atom(function("data", [sample_id, miRNAs[i], stored_levels[i]]))])
+
+
+# ground ASP program in a new solver session
+def ground_program(parts, options, data=None, data_encoding="dense"):
+
+    """
+
+    Grounds an ASP program in a new solver session (clingo backend).
+
+    Parameters
+    ----------
+    parts : list
+        parts of the ASP program, e.g., instance, constraints and program (added one by one, not concatenated,
+        parts stored in files are read by the solver, see ProgramFile)
+    options : str
+        clasp options
+    data : Dataset
+        if given, tissue and miRNA data are added as facts (see add_data_facts)
+    data_encoding : str
+        values of miRNA data added as facts (see classifier.stored_values)
+
+    Returns
+    -------
+    clingo.Control
+        grounded solver session
+
+    """
+
+    control = clingo.Control(shlex.split(options))
+    if data is not None:
+        add_data_facts(control, data, data_encoding)
+    texts, files = split_parts(parts)
+    for path in files:
+        control.load(path)
+    for part in texts:
+        control.add("base", [], part)  # parts are not concatenated
+    control.ground([("base", [])])
+
+    return control
+
+
+# solve grounded program and collect optimal answers
+def solve_control(control, time_limit=None, on_solution=None):
+
+    """
+
+    Solves a grounded program and collects optimal answers. The search is interrupted after time_limit seconds,
+    if no optimal answer was found until then, the best model found so far is returned (status FEASIBLE).
+
+    Parameters
+    ----------
+    control : clingo.Control
+        grounded solver session
+    time_limit : float
+        max time of the solver call in seconds (None - no limit)
+    on_solution : callable
+        if given, each optimal answer is passed to it as soon as it is found and is not collected
+
+    Returns
+    -------
+    status : str
+        status of the solver call (SAT, UNSAT, TIMEOUT or FEASIBLE)
+    solutions : list
+        list of optimal answers or the best model found so far (formatted as returned by Clyngor)
+
+    """
+
+    deadline = None if time_limit is None else time.time() + time_limit
+
+    solutions = []
+    found = False  # optimal answer was found
+    best = None  # models are improving until the optimum is proven
+    status = None
+    with control.solve(yield_=True, async_=True) as handle:
+        while True:
+            handle.resume()  # search for the next model
+            timeout = None if deadline is None else max(0.0, deadline - time.time())
+            if not handle.wait(timeout):  # time limit exceeded
+                handle.cancel()
+                status = TIMEOUT
+                break
+            model = handle.model()
+            if model is None:  # search finished
+                break
+            if model.optimality_proven:  # if solution is optimal
+                found = True
+                if on_solution is not None:
+                    on_solution(model2answer(model))  # pass solution on
+                else:
+                    solutions.append(model2answer(model))  # add solution to solution list
+            else:
+                best = model2answer(model)  # best model found so far
+
+        result = handle.get()
+
+    if status == TIMEOUT and not found and best is not None:
+        status = FEASIBLE
+        solutions = [best]
+
+    if status is None:
+        status = SAT if result.satisfiable else UNSAT
+
+    return status, solutions
+
+
+# solve ASP program from scratch and return optimal answers
+def solve_program(asp_program, options, backend="clyngor", data=None, data_encoding="dense", time_limit=None,
+                  on_solution=None):
+
+    """
+
+    Solves an ASP program from scratch and collects optimal answers. If the solver call is interrupted
+    after time_limit seconds before an optimal answer is found, the best model found so far is returned
+    (status FEASIBLE).
+
+    Parameters
+    ----------
+    asp_program : str, ProgramFile or list
+        instance, constraints and program, or a list of these parts (the clingo backend adds parts one by one,
+        Clyngor receives parts given as text joined, parts stored in files are read by the solver)
+    options : str
+        clasp options
+    backend : str
+        - clyngor: solve ASP text with Clyngor
+        - clingo: solve in-process with the clingo Python API, models are received as symbols
+    data : Dataset
+        if given, tissue and miRNA data are added as facts through the clingo backend
+        (asp_program does not contain them)
+    data_encoding : str
+        values of miRNA data added as facts (see classifier.stored_values)
+    time_limit : float
+        max time of the solver call in seconds (None - no limit, a limit requires the clingo backend)
+    on_solution : callable
+        if given, each optimal answer is passed to it as soon as it is found and is not collected
+
+    Returns
+    -------
+    status : str
+        status of the solver call (SAT, UNSAT, TIMEOUT or FEASIBLE, see solve_control)
+    solutions : list
+        list of optimal answers or the best model found so far (formatted as returned by Clyngor)
+
+    """
+
+    if backend not in BACKENDS:
+        raise ValueError("Unknown solver backend: %s" % backend)
+
+    if backend == "clingo":
+        control = ground_program(asp_program if isinstance(asp_program, list) else [asp_program], options, data,
+                                 data_encoding)
+
+        status, solutions = solve_control(control, time_limit, on_solution)
+        if status in [TIMEOUT, FEASIBLE]:
+            print("\nTIME WARNING: solver call interrupted after ", time_limit, " seconds.")
+
+        return status, solutions
+
+    if data is not None:
+        raise ValueError("Data facts may be added only with the clingo backend.")
+    if time_limit is not None:
+        raise ValueError("Time limit of solver calls is supported only with the clingo backend.")
+
+    texts, files = split_parts(asp_program)
+    options, model_limit = split_model_limit(options)
+    answers = solve(files=files, inline="".join(texts), options=options, nb_model=model_limit)  # solve program
+
+    #  '--quiet=1' option does not work with clyngor
+    #  answers.with_optimality returns information about optimality of answers
+    solutions = []
+    found = False  # optimal answer was found
+    for answer in answers.with_optimality:
+        if answer[2] is True:  # if solution is optimal
+            found = True
+            if on_solution is not None:
+                on_solution(answer[0])  # pass solution on
+            else:
+                solutions.append(list(answer)[0])  # ad solutions to solution list
+
+    return (SAT if found else UNSAT), solutions
+
+
+# convert clingo model to answer formatted as returned by clyngor
+def model2answer(model):
+
+    """
+
+    Converts a clingo model to an answer in the format returned by Clyngor.
+
+    Parameters
+    ----------
+    model : clingo.Model
+        model found by clingo
+
+    Returns
+    -------
+    frozenset
+        shown atoms as (predicate, arguments) pairs
+
+    """
+
+    return frozenset(clingo_symbol_as_python_value(atom) for atom in model.symbols(shown=True))
+
+
+# class for multi-shot solving of the relaxation grid
+class IncrementalSolver:
+
+    """
+
+    Class representing an in-process solver session for the constraints relaxation.
+
+    The instance and the program are grounded once. Bounds on false positives and false negatives
+    (upper_bound_falsepos/1 and upper_bound_falseneg/1) are declared as external atoms and only their
+    truth values are changed between the solver calls. If data is given, tissue and miRNA data are added
+    as facts through the clingo backend (see add_data_facts).
+
+    The session is reused only while bounds on errors are relaxed, e.g., along a row of the grid in row-major
+    order. If a bound is tightened, the program is grounded in a new session: heuristics and learnt constraints
+    of calls with other bounds may slow the search down by orders of magnitude (cells solved in a fraction
+    of a second by a new session were not solved in minutes), which forgetting them on each call does not prevent.
+
+    Attributes
+    ----------
+    control : clingo.Control
+        grounded solver session
+    fp_max : int
+        number of max allowed false positive errors
+    fn_max : int
+        number of max allowed false negative errors
+    bounds : tuple
+        bounds on errors (fp, fn) of the last solver call in the session (None - session was not used yet)
+    groundings : int
+        number of sessions the program was grounded in
+
+    Methods
+    -------
+    solve(fp, fn, time_limit=None, on_solution=None)
+        Solves the program for given bounds on errors.
+    """
+
+    def __init__(self, instance, program, fp_max, fn_max, options, data=None, data_encoding="dense"):
+        self.fp_max = fp_max  # max number of FPs
+        self.fn_max = fn_max  # max number of FNs
+
+        # bounds on errors are switched on and off as external atoms
+        externals = "\n".join(["#external upper_bound_falsepos(0.." + str(fp_max) + ").",
+                               "#external upper_bound_falseneg(0.." + str(fn_max) + ")."])
+        self.parts = [instance, externals, program]
+        self.options = options
+        self.data = data
+        self.data_encoding = data_encoding
+
+        self.control = ground_program(self.parts, options, data, data_encoding)  # ground instance and program once
+        self.bounds = None
+        self.groundings = 1
+
+    def solve(self, fp, fn, time_limit=None, on_solution=None):
+
+        """
+
+        Solves the grounded program for given bounds on errors (in a new session if a bound is tightened).
+
+        Parameters
+        ----------
+        fp : int
+            number of allowed false positive errors
+        fn : int
+            number of allowed false negative errors
+        time_limit : float
+            max time of the solver call in seconds (None - no limit)
+        on_solution : callable
+            if given, each optimal answer is passed to it as soon as it is found and is not collected
+
+        Returns
+        -------
+        status : str
+            status of the solver call (SAT, UNSAT, TIMEOUT or FEASIBLE, see solve_control)
+        solutions : list
+            list of optimal answers or the best model found so far (formatted as returned by Clyngor)
+
+        """
+
+        if self.bounds is not None and (fp < self.bounds[0] or fn < self.bounds[1]):  # bounds are tightened
+            self.control = ground_program(self.parts, self.options, self.data, self.data_encoding)
+            self.groundings += 1
+        self.bounds = (fp, fn)
+
+        # exactly one bound on false positives and one bound on false negatives is true
+        for i in range(0, self.fp_max + 1):
+            self.control.assign_external(clingo.Function("upper_bound_falsepos", [clingo.Number(i)]), i == fp)
+        for j in range(0, self.fn_max + 1):
+            self.control.assign_external(clingo.Function("upper_bound_falseneg", [clingo.Number(j)]), j == fn)
+
+        return solve_control(self.control, time_limit, on_solution)
+
+
+# program solved by a worker process
+_worker_program = None
+
+
+# initialize worker process
+def _init_worker(instance, program, options, data, data_encoding):
+
+    global _worker_program
+    _worker_program = (instance, program, options, data, data_encoding)
+
+
+# solve single cell of the relaxation grid in worker process
+def _solve_cell(fp, fn, time_limit, deadline):
+
+    if deadline is not None:  # cell may be started late
+        remaining = max(0.0, deadline - time.time())
+        time_limit = remaining if time_limit is None else min(time_limit, remaining)
+
+    # each cell is solved in a new session (see IncrementalSolver), cells are received in any order
+    instance, program, options, data, data_encoding = _worker_program
+    constraints = "\n".join(["upper_bound_falsepos(" + str(fp) + ").", "upper_bound_falseneg(" + str(fn) + ")."])
+    control = ground_program([instance, constraints, program], options, data, data_encoding)
+    status, solutions = solve_control(control, time_limit)
+
+    return fp, fn, status, solutions
+
+
+# class for parallel solving of the relaxation grid
+class ParallelSolver:
+
+    """
+
+    Class representing a pool of worker processes solving cells of the relaxation grid.
+
+    Each worker solves the cells it receives in new solver sessions, cells are received in any order
+    (data is passed to the workers, a cached data set is memory-mapped by each of them).
+    At most jobs cells are solved at the same time. The pool is kept until the solver is closed,
+    so it may be used for several batches of cells.
+
+    Attributes
+    ----------
+    executor : ProcessPoolExecutor
+        pool of worker processes
+    jobs : int
+        number of worker processes
+
+    Methods
+    -------
+    solve_cells(cells, time_limit=CELL_TIME_LIMIT, deadline=None, frontier=None)
+        Solves cells in worker processes.
+    close()
+        Shuts the worker processes down.
+    """
+
+    def __init__(self, instance, program, options, jobs, data=None, data_encoding="dense"):
+        self.jobs = jobs  # number of worker processes
+        self.executor = ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                            initargs=(instance, program, options, data, data_encoding))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+
+        """
+
+        Shuts the worker processes down and cancels cells that were not started yet.
+
+        """
+
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+    def solve_cells(self, cells, time_limit=CELL_TIME_LIMIT, deadline=None, frontier=None):
+
+        """
+
+        Solves cells of the relaxation grid in worker processes. Running cells are interrupted at the deadline,
+        cells that are not started before the deadline are cancelled.
+
+        Parameters
+        ----------
+        cells : list
+            list of (fp, fn) pairs to solve (submitted in the given order)
+        time_limit : float
+            max time of a single cell in seconds (None - no limit, a single cell may block the workers)
+        deadline : float
+            time (as returned by time.time) at which the computation is stopped (None - no limit)
+        frontier : trainer.FeasibilityFrontier
+            if given, statuses of solved cells are recorded and cells implied to be unsatisfiable
+            are not solved
+
+        Returns
+        -------
+        outcomes : dict
+            (fp, fn) pairs mapped to (status, solutions) of solved (or skipped) cells
+
+        """
+
+        outcomes = {}
+        futures = {}
+        for i, j in cells:
+            if frontier is not None and frontier.implied_status(i, j) == UNSAT:
+                frontier.skip(i, j)
+                outcomes[(i, j)] = (UNSAT, [])
+            else:
+                futures[self.executor.submit(_solve_cell, i, j, time_limit, deadline)] = (i, j)
+
+        for future in as_completed(futures):
+            if future.cancelled():
+                continue
+
+            i, j, status, solutions = future.result()
+            print("Solved: FP: ", i, " FN: ", j, " SUM:", i + j, " STATUS:", status)
+            outcomes[(i, j)] = (status, solutions)
+
+            # skip cells that were not started yet and are implied to be unsatisfiable
+            if frontier is not None:
+                frontier.record(i, j, status)
+                for pending, cell in futures.items():
+                    if cell not in outcomes and frontier.implied_status(*cell) == UNSAT and pending.cancel():
+                        frontier.skip(*cell)
+                        outcomes[cell] = (UNSAT, [])
+
+            # check current time and cancel cells that were not started yet
+            if deadline is not None and time.time() >= deadline:
+                for pending in futures:
+                    pending.cancel()
+
+        return outcomes
@@ -1,5 +1,20 @@
+import io
+import os
+import pickle
+import tempfile
+import time
 import unittest
+import numpy
+import ASP_prog_generator
 import filter
+import trainer
+import converter
+import classifier
+import packed_evaluator
+import dataset
+import feature_reducer
+import solver
+import result_cache
 import example_data
 
 
@@ -23,6 +38,373 @@ class TestTraining(unittest.TestCase):
         solution_list, correct_output = example_data.create_example_symmetry_instance()
         self.assertListEqual(filter.filter_symmetric_solutions(solution_list), correct_output)
 
+    # test compact results
+    def test_compact_result(self):
+
+        answers = [frozenset([("gate_input", (2, "negative", "g3")), ("gate_input", (1, "positive", "g34")),
+                              ("gate_input", (1, "negative", "g2"))]),
+                   frozenset([("gate_input", (1, "positive", "g3"))])]
+        result = converter.convert_asp_results([trainer.Result(answers, [], 1, 1, 0, 0)])[0]
+        self.assertEqual((result.count(), result.size), (2, 1))
+
+        # answers removed by filters are never converted
+        worse = converter.convert_asp_results([trainer.Result(answers[:1], [], 2, 2, 0, 0)])[0]
+        best = filter.filter_best_solutions([1, 2], [result, worse])
+        self.assertEqual((len(best), worse.answers), (2, answers[:1]))
+
+        self.assertListEqual(result.solutions_str, ["gate_input(1,negative,g2) gate_input(1,positive,g34) "
+                                                    "gate_input(2,negative,g3) ", "gate_input(1,positive,g3) "])
+        self.assertListEqual(result.solutions_by_gate, [[[("g2", "negative"), ("g34", "positive")],
+                                                         [("g3", "negative")]], [[("g3", "positive")]]])
+
+        single = result.split()
+        self.assertEqual(single[0].solutions_str, result.solutions_str[0])
+        self.assertListEqual(single[1].solutions_by_gate, result.solutions_by_gate[1])
+        self.assertIs(single[0].classifiers, result.classifiers[0])
+        self.assertFalse(hasattr(single[0], "__dict__"))
+        # results carry their table of features, so they are decoded the same way in other processes
+        self.assertEqual(pickle.loads(pickle.dumps(single[1])).solutions_str, result.solutions_str[1])
+
+    # test filtering of a stream of solutions
+    def test_stream_filter(self):
+
+        received = []
+        emitter = trainer.ClassifierEmitter(1, 0, received.append)
+        emitter(frozenset([("gate_input", (2, "negative", "g3")), ("gate_input", (1, "positive", "g34"))]))
+        emitter(frozenset([("gate_input", (1, "negative", "g3")), ("gate_input", (2, "positive", "g34"))]))
+        emitter(frozenset([("gate_input", (1, "positive", "g5"))]))
+        self.assertEqual(received[0].solutions_str, "gate_input(1,positive,g34) gate_input(2,negative,g3) ")
+        self.assertEqual((received[0].errors, received[0].size, emitter.count), (1, 2, 3))
+
+        stream_filter = filter.StreamFilter()
+        for solution in received:
+            stream_filter.add(solution)
+        self.assertListEqual(stream_filter.results(), [received[2]])
+
+        # same result as the filters applied to collected solutions
+        stream_filter = filter.StreamFilter()
+        worse = trainer.ClassifierEmitter(2, 0, stream_filter.add)
+        worse(frozenset([("gate_input", (1, "positive", "g7"))]))
+        for solution in received[:2]:
+            stream_filter.add(solution)
+        self.assertListEqual(stream_filter.results(),
+                             filter.filter_symmetric_solutions(filter.filter_shortest_solutions(received[:2])))
+
+    # test relaxation_order
+    def test_relaxation_order(self):
+
+        self.assertListEqual(trainer.relaxation_order(0, 0, 1, 2, "grid"),
+                             [[(0, 0), (0, 1), (0, 2), (1, 0), (1, 1), (1, 2)]])
+        self.assertListEqual(trainer.relaxation_order(0, 0, 1, 2, "diagonal"),
+                             [[(0, 0)], [(0, 1), (1, 0)], [(0, 2), (1, 1)], [(1, 2)]])
+
+    # test splitting of remaining time among cells
+    def test_cell_time_limit(self):
+
+        deadline = time.time() + 100
+        self.assertAlmostEqual(trainer.cell_time_limit(None, deadline, 4), 25, delta=1)
+        self.assertAlmostEqual(trainer.cell_time_limit(None, deadline, 4, jobs=2), 50, delta=1)
+        self.assertEqual(trainer.cell_time_limit(10, deadline, 4), 10)
+        self.assertEqual(trainer.cell_time_limit(10, None, 4), 10)
+        self.assertIsNone(trainer.cell_time_limit(None, None, 4))
+
+    # test FeasibilityFrontier
+    def test_feasibility_frontier(self):
+
+        frontier = trainer.FeasibilityFrontier()
+        frontier.record(2, 1, "UNSAT")
+        frontier.record(1, 3, "SAT")
+        self.assertEqual(frontier.implied_status(0, 1), "UNSAT")
+        self.assertEqual(frontier.implied_status(2, 0), "UNSAT")
+        self.assertEqual(frontier.implied_status(3, 3), "SAT")
+        self.assertIsNone(frontier.implied_status(3, 1))
+        self.assertIsNone(frontier.implied_status(0, 3))
+        frontier.record(3, 1, "UNSAT")
+        self.assertListEqual(frontier.unsat, [(3, 1)])
+
+    # test packed evaluation of classifiers against per-sample evaluation
+    def test_packed_evaluation(self):
+
+        miRNAs, rows = classifier.csv2rows("example_test.csv")
+        data = packed_evaluator.PackedData.from_rows(miRNAs, rows)
+        classifiers = ["gate_input(1,positive,g34)",
+                       "gate_input(1,positive,g34) gate_input(1,negative,g3) gate_input(2,negative,g5)",
+                       "gate_input(1,negative,g34) gate_input(2,positive,g10) gate_input(2,positive,g11)"]
+
+        for gate_inputs, scores in zip(classifiers, packed_evaluator.evaluate_many(data, classifiers)):
+            function = classifier.gateinputs2function(gate_inputs)
+            errors = [function(row) for row in rows]
+            false_neg = sum([1 for fp, fn, malfunction in errors if fn])
+            false_pos = sum([1 for fp, fn, malfunction in errors if fp])
+            self.assertEqual(scores, (false_neg, false_pos))
+            self.assertEqual(classifier.check_classifier("example_test.csv", gate_inputs), (false_neg, false_pos))
+            self.assertEqual(classifier.check_classifier(data, gate_inputs), (false_neg, false_pos))
+
+    # test columnar data set against csv2rows
+    def test_dataset(self):
+
+        miRNAs, rows = classifier.csv2rows("example_train.csv")
+        data = dataset.Dataset.from_csv("example_train.csv")
+        self.assertListEqual(data.features, miRNAs)
+        self.assertListEqual(data.rows(), rows)
+        self.assertListEqual(data.column("g34").tolist(), [int(row["g34"]) for row in rows])
+
+        # cached data set is memory-mapped and equal to the parsed one
+        with tempfile.TemporaryDirectory() as cache_dir:
+            dataset.load_dataset("example_train.csv", cache_dir)
+            cached = dataset.load_dataset("example_train.csv", cache_dir)
+            self.assertIsNotNone(cached.cache_path)
+            self.assertListEqual(cached.rows(), rows)
+            self.assertListEqual(pickle.loads(pickle.dumps(cached)).rows(), rows)
+
+        # samples with identical profiles and annotations are merged
+        matrix = [[1, 0], [0, 1], [1, 0], [1, 0]]
+        data = dataset.Dataset("test.csv", ["s1", "s2", "s3", "s4"], [1, 0, 1, 0], ["a", "b"], matrix)
+        deduplicated = data.deduplicated()
+        self.assertListEqual(deduplicated.ids, ["s1", "s2", "s4"])
+        self.assertListEqual(deduplicated.weights.tolist(), [2, 1, 1])
+        self.assertListEqual(deduplicated.deduplicated().weights.tolist(), [2, 1, 1])
+
+    # test packing of facts into lines
+    def test_fact_writer(self):
+
+        stream = io.StringIO()
+        writer = classifier.FactWriter(stream, line_length=10)
+        writer.write_facts(["a(%i)." % i for i in range(5)])
+        writer.end_block()
+        writer.write_line("b.")
+        self.assertEqual(stream.getvalue(), "a(0). a(1). a(2).\na(3). a(4).\nb.\n")
+
+        # instance and program are written to a given stream as they are generated
+        data = dataset.Dataset.from_csv("example_train.csv")
+        gate_types = [{"LowerBoundPos": 0, "UpperBoundPos": 2, "LowerBoundNeg": 0, "UpperBoundNeg": 1,
+                       "UpperBoundOcc": 2}]
+        arguments = [data, None, 1, 4, 1, 2, gate_types, False, 1, False, True, False, 0, True, False, 0, 0]
+        stream = io.StringIO()
+        self.assertIsNone(classifier.csv2asp(*arguments, stream=stream))
+        self.assertEqual(stream.getvalue(), classifier.csv2asp(*arguments))
+
+    # test adding data facts through the clingo backend
+    def test_clingo_backend(self):
+
+        data = dataset.Dataset.from_csv("example_train.csv")
+        program = "is_mirna(M) :- data(T,M,high), tissue(T,cancer). #minimize{1,M: is_mirna(M)}. #show is_mirna/1."
+        with_text = classifier.FactWriter(io.StringIO())
+        classifier.write_data_facts(with_text, data)
+
+        status, expected = solver.solve_program(with_text.stream.getvalue() + program, "--opt-mode=optN", "clingo")
+        self.assertEqual((status, len(expected)), (solver.SAT, 1))
+        self.assertEqual(solver.solve_program(program, "--opt-mode=optN", "clingo", data), (solver.SAT, expected))
+        self.assertEqual(solver.solve_program(with_text.stream.getvalue() + program, "--opt-mode=optN"),
+                         (solver.SAT, expected))
+
+        # parts stored in files are read by the solver
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "instance.asp")
+            with open(path, "w") as f:
+                f.write(with_text.stream.getvalue())
+            for backend in solver.BACKENDS:
+                self.assertEqual(solver.solve_program([solver.ProgramFile(path), program], "--opt-mode=optN", backend),
+                                 (solver.SAT, expected))
+            self.assertEqual(result_cache.program_key(solver.ProgramFile(path), program, "--opt-mode=optN"),
+                             result_cache.program_key(with_text.stream.getvalue(), program, "--opt-mode=optN"))
+
+        # an interrupted call returns the best model found so far (optimality of 11 pigeons in 11 holes is hard)
+        pigeons = "{in(P,H): hole(H)} 1 :- pigeon(P). pigeon(1..12). hole(1..11). :- in(P1,H), in(P2,H), P1 < P2. " \
+                  "#minimize{1,P: pigeon(P), not in(P,_)}. #show in/2."
+        status, solutions = solver.solve_program(pigeons, "--opt-mode=optN", "clingo", time_limit=0.5)
+        self.assertEqual((status, len(solutions)), (solver.FEASIBLE, 1))
+
+    # test incremental solving of cells in arbitrary order
+    def test_incremental_order(self):
+
+        data = dataset.Dataset.from_csv("example_train.csv")
+        noise = numpy.random.RandomState(1)
+        annots = numpy.where(noise.rand(len(data.ids)) < 0.05, 1 - data.annots, data.annots)
+        matrix = numpy.where(noise.rand(*data.matrix.shape) < 0.05, 1 - data.matrix, data.matrix)
+        noisy = dataset.Dataset("noisy.csv", data.ids, annots, data.features, matrix)
+        gate_types = [{"LowerBoundPos": 0, "UpperBoundPos": 3, "LowerBoundNeg": 0, "UpperBoundNeg": 0,
+                       "UpperBoundOcc": 2},
+                      {"LowerBoundPos": 0, "UpperBoundPos": 0, "LowerBoundNeg": 0, "UpperBoundNeg": 1,
+                       "UpperBoundOcc": 4}]
+        program = classifier.csv2asp(noisy, None, 1, 2, 1, 2, gate_types, False, 1, False, True, False, 0, False,
+                                     False, 0, 0)
+
+        # a session reused for these cells did not solve the last one in minutes
+        cells = [(7, 4), (0, 4), (1, 2), (0, 2), (4, 8), (3, 3), (4, 0), (7, 7), (2, 7), (0, 7), (5, 5), (2, 1), (6, 7)]
+        session = solver.IncrementalSolver(program, "", 8, 8, "--opt-mode=optN")
+        for i, j in cells:
+            status, solutions = session.solve(i, j, time_limit=20)
+            self.assertIn(status, [solver.SAT, solver.UNSAT])
+        self.assertEqual(session.groundings, 10)  # sessions are reused while bounds are relaxed
+
+        constraints = "upper_bound_falsepos(6). upper_bound_falseneg(7)."
+        self.assertEqual(set(solutions), set(solver.solve_program([program, constraints], "--opt-mode=optN",
+                                                                  "clingo")[1]))
+
+    # test solver settings
+    def test_solver_settings(self):
+
+        settings = solver.SolverSettings(threads=4, parallel_mode="split", configuration="crafty", model_limit=2)
+        self.assertEqual(settings.options(),
+                         "--opt-mode=optN --parallel-mode=4,split --configuration=crafty --models=2")
+        self.assertEqual(solver.split_model_limit(settings.options()),
+                         ("--opt-mode=optN --parallel-mode=4,split --configuration=crafty", 2))
+        self.assertEqual(solver.SolverSettings().options(), "--opt-mode=optN")
+
+        program = "{a(1..4)}. :- not 2{a(X)}. #minimize{1,X: a(X)}. #show a/1."
+        for backend in solver.BACKENDS:
+            self.assertEqual(len(solver.solve_program(program, "--opt-mode=optN", backend)[1]), 6)
+            self.assertEqual(len(solver.solve_program(program, settings.options(), backend)[1]), 2)
+            self.assertEqual(solver.solve_program(program + ":- a(X).", "--opt-mode=optN", backend),
+                             (solver.UNSAT, []))
+
+    # test on-disk cache of solver results
+    def test_result_cache(self):
+
+        answer = frozenset([("gate_input", (1, "positive", "g34")), ("gate_input", (2, "negative", "g3"))])
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = result_cache.ResultCache(cache_dir, "a.", "b :- a.", "--opt-mode=optN")
+            cache.put(0, 1, solver.SAT, [answer])
+            cache.put(1, 1, solver.FEASIBLE, [answer], 10)
+            cache.put(0, 0, solver.UNSAT, [])
+
+            cache = result_cache.ResultCache(cache_dir, "a.", "b :- a.", "--opt-mode=optN")
+            self.assertEqual(cache.get(0, 1), (solver.SAT, [answer]))
+            self.assertEqual(cache.get(0, 0), (solver.UNSAT, []))
+            self.assertIsNone(cache.get(1, 0))
+            self.assertIsNone(cache.get(1, 1))  # interrupted call is not reused without a time limit
+            self.assertIsNone(cache.get(1, 1, 20))
+            self.assertEqual(cache.get(1, 1, 5), (solver.FEASIBLE, [answer]))
+            self.assertEqual(cache.hits, 3)
+
+            other = result_cache.ResultCache(cache_dir, "a.", "b :- a.", "--opt-mode=optN --models=1")
+            self.assertIsNone(other.get(0, 1))
+
+    # test consistency and constant-feature check
+    def test_check_csv(self):
+
+        matrix = [[1, 0, 1], [1, 1, 1], [1, 0, 1], [1, 1, 1], [1, 0, 0]]
+        data = dataset.Dataset("test.csv", ["s1", "s2", "s3", "s4", "s5"], [1, 0, 0, 0, 1], ["a", "b", "c"], matrix)
+        inconsistent_groups, constants, duplicates = classifier.check_csv(data)
+        self.assertListEqual(inconsistent_groups, [["s1", "s3"]])
+        self.assertListEqual(constants, ["a"])
+        self.assertListEqual(duplicates, [["s1", "s3"], ["s2", "s4"]])
+
+    # test merging of equivalent features
+    def test_feature_reduction(self):
+
+        matrix = [[1, 0, 1, 1, 0], [0, 1, 0, 1, 1], [1, 0, 1, 1, 1]]
+        data = dataset.Dataset("test.csv", ["s1", "s2", "s3"], [1, 0, 1], ["a", "b", "c", "d", "e"], matrix)
+        reduced_data, reduction = feature_reducer.reduce_features(data, merge_complements=True)
+        self.assertListEqual(reduced_data.features, ["a", "e"])
+        self.assertListEqual(reduced_data.column("e").tolist(), [0, 1, 1])
+        self.assertDictEqual(reduction.duplicates, {"a": ["c"]})
+        self.assertDictEqual(reduction.complements, {"a": ["b"]})
+        self.assertListEqual(reduction.constants, ["d"])
+
+        answer = frozenset([("gate_input", (1, "positive", "a")), ("gate_input", (2, "negative", "e"))])
+        self.assertSetEqual(set(reduction.expand([answer])),
+                            {answer,
+                             frozenset([("gate_input", (1, "positive", "c")), ("gate_input", (2, "negative", "e"))]),
+                             frozenset([("gate_input", (1, "negative", "b")), ("gate_input", (2, "negative", "e"))])})
+        self.assertEqual(reduction.expansions(answer), 3)
+
+        # answers are expanded only when the result is split
+        result = converter.convert_asp_results([trainer.Result([answer], [], 0, 0, 0, 0, reduction=reduction)], 0)[0]
+        self.assertEqual((result.count(), result.answers), (3, [answer]))
+        self.assertEqual(len(result.split()), 3)
+
+        # a complementary feature replaces a merged feature with the opposite sign
+        free = {"LowerBoundPos": 0, "UpperBoundPos": 4, "LowerBoundNeg": 0, "UpperBoundNeg": 4, "UpperBoundOcc": 2}
+        positive = {"LowerBoundPos": 0, "UpperBoundPos": 3, "LowerBoundNeg": 0, "UpperBoundNeg": 0, "UpperBoundOcc": 2}
+        self.assertTrue(feature_reducer.sign_swaps_allowed([free, free], 4))
+        self.assertFalse(feature_reducer.sign_swaps_allowed([free, free], 5))  # 3 positive and 2 negative inputs
+        self.assertFalse(feature_reducer.sign_swaps_allowed([free, positive], 4))
+        self.assertFalse(feature_reducer.sign_swaps_allowed([dict(free, LowerBoundPos=1)], 4))
+        self.assertFalse(ASP_prog_generator.complements_mergeable("asp_constr.ini"))
+
+    # test constraints under which features are not reduced
+    def test_reduction_constraints(self):
+
+        # a OR (x AND y) in CNF uses a in both gates, unique inputs require its identical copy b
+        matrix = [[a, a, x, y] for a in [0, 1] for x in [0, 1] for y in [0, 1]]
+        annots = [int(a or (x and y)) for a, b, x, y in matrix]
+        data = dataset.Dataset("test.csv", ["s%i" % i for i in range(8)], annots, ["a", "b", "x", "y"], matrix)
+        reduced_data, reduction = feature_reducer.reduce_features(data)
+        gate_types = [{"LowerBoundPos": 0, "UpperBoundPos": 2, "LowerBoundNeg": 0, "UpperBoundNeg": 0,
+                       "UpperBoundOcc": 2}]
+
+        for uniqueness in [False, True]:
+            answers = []
+            for train_data in [data, reduced_data]:
+                program = classifier.csv2asp(train_data, None, 1, 4, 1, 2, gate_types, False, 1, False, True,
+                                             uniqueness, 0, True, False, 0, 0)
+                answers.append(set(solver.solve_program(program, "--opt-mode=optN", "clingo")[1]))
+            expanded = set(reduction.expand(answers[1]))
+            self.assertEqual(expanded == answers[0], not uniqueness)
+            self.assertEqual(feature_reducer.reduction_allowed(gate_types, 1, 1, uniqueness, 1), not uniqueness)
+        self.assertEqual((len(answers[0]), len(answers[1])), (4, 0))
+
+        self.assertFalse(feature_reducer.reduction_allowed(gate_types, 2, 1, False, 1))
+        self.assertFalse(feature_reducer.reduction_allowed([dict(gate_types[0], LowerBoundPos=1)], 1, 1, False, 1))
+        self.assertFalse(feature_reducer.reduction_allowed(gate_types, 1, 1, False, 4))  # inputs are not minimized
+        self.assertTrue(ASP_prog_generator.features_reducible("asp_constr.ini"))
+
+    # test removal of dominated inputs
+    def test_dominated_inputs(self):
+
+        matrix = [[1, 1, 0], [0, 1, 0], [1, 0, 1], [0, 0, 1]]
+        data = dataset.Dataset("test.csv", ["s1", "s2", "s3", "s4"], [1, 0, 1, 0], ["a", "b", "c"], matrix)
+        kept_pos, kept_neg = feature_reducer.undominated_inputs(data)
+        self.assertListEqual(kept_pos.tolist(), [True, False, False])
+        self.assertListEqual(kept_neg.tolist(), [False, True, True])
+
+        kept_pos, kept_neg = feature_reducer.undominated_inputs(data, feasible_pos=numpy.array([False, True, True]))
+        self.assertListEqual(kept_pos.tolist(), [False, True, True])
+
+    # test lexicographic order of gates of the same type and projection on classifiers
+    def test_gate_order(self):
+
+        matrix = [[1, 1, 0], [1, 1, 1], [0, 1, 1], [1, 0, 0]]
+        data = dataset.Dataset("test.csv", ["s1", "s2", "s3", "s4"], [1, 1, 0, 0], ["a", "b", "c"], matrix)
+        gate_types = [{"LowerBoundPos": 0, "UpperBoundPos": 2, "LowerBoundNeg": 0, "UpperBoundNeg": 0,
+                       "UpperBoundOcc": 3}]
+
+        keys = []
+        for order_gates, project in [(False, False), (True, False), (False, True)]:
+            program = classifier.csv2asp(data, None, 1, 4, 1, 3, gate_types, False, 1, False, True, False, 0, True,
+                                         False, 0, 0, order_gates=order_gates, project_classifiers=project)
+            options = solver.SolverSettings(project=project).options()
+            answers = converter.convert_asp_results([trainer.Result(solver.solve_program(program, options)[1],
+                                                                    [], 0, 0, 0, 0)], 0)[0].split()
+            keys.append([filter.symmetry_key(answer) for answer in answers])
+
+        # a AND b: both orders of gates are enumerated without the order or the projection, a single one with them
+        self.assertListEqual([len(key) for key in keys], [2, 1, 1])
+        self.assertEqual(set(keys[0]), set(keys[1]))
+        self.assertEqual(set(keys[0]), set(keys[2]))
+
+    # test sparse data encodings
+    def test_data_encoding(self):
+
+        matrix = [[1, 0], [0, 0], [1, 0]]
+        data = dataset.Dataset("test.csv", ["s1", "s2", "s3"], [1, 0, 1], ["a", "b"], matrix)
+        self.assertListEqual(classifier.stored_values(data, "high").tolist(), [True, True])
+        self.assertListEqual(classifier.stored_values(data, "minority").tolist(), [False, True])
+
+        writer = classifier.FactWriter(io.StringIO())
+        classifier.write_data_facts(writer, data, "minority")
+        facts = writer.stream.getvalue().split()
+        self.assertIn("sparse_value(a,low).", facts)
+        self.assertIn("data(s2,a,low).", facts)
+        self.assertEqual(len([fact for fact in facts if fact.startswith("data(")]), 1)
+
+        # inputs feasible for cancer samples (EfficiencyConstraint)
+        feasible_pos, feasible_neg = classifier.feasible_inputs(data)
+        self.assertListEqual(feasible_pos.tolist(), [True, False])
+        self.assertListEqual(feasible_neg.tolist(), [False, True])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,5 +1,6 @@
 import converter
-from clyngor import solve
+import result_cache
+import solver
 import time
 
 
@@ -8,14 +9,17 @@ class Result:
 
     """
 
-    Class representing an ASP Result.
+    Class representing an ASP Result. Solutions are kept as answers returned by the solver and encoded
+    as compact classifiers (see converter.encode_answer) when first requested, so results removed by filters
+    are never converted. Strings and lists of gates are generated from compact classifiers when requested.
+    A Result created from strings and lists (e.g., by an older caller) keeps them as given.
 
     Attributes
     ----------
     solutions_str : list
-        list of all solutions belonging to the Result (formatted as strings)
+        list of all solutions belonging to the Result (formatted as strings), a string for a single solution
     solutions_by_gate : list
-        list of all solutions belonging to the Result (formatted as lists)
+        list of all solutions belonging to the Result (formatted as lists), a list of gates for a single solution
     errors : int
         list of total errors received for the Result
     fp : int
@@ -24,22 +28,517 @@ class Result:
         number of false negatives received for the Result
     size : int
         size of solutions in the Result
+    optimal : bool
+        False if the solver call was interrupted and solutions are not proven optimal
+    classifiers : list
+        compact classifiers of all solutions, a single classifier for a single solution (None - no solutions
+        given as answers)
+    single : bool
+        True if the Result contains a single solution
+    answers : list
+        answers not encoded yet (formatted as returned by Clyngor), a single answer for a single solution
+    reduction : FeatureReduction
+        if given, answers are found on reduced features and are expanded to all equivalent answers when
+        they are split or encoded (see feature_reducer.FeatureReduction)
+    table : FeatureTable
+        interned names of features of compact classifiers (see converter.FeatureTable)
 
     Methods
     -------
+    count()
+        Returns the number of solutions.
+    split()
+        Returns a Result for each solution.
     """
 
-    def __init__(self, solutions_str, solutions_by_gate, errors, fp, fn, size):
-        self.solutions_str = solutions_str  # solutions as str
-        self.solutions_by_gate = solutions_by_gate  # solutions as lists
+    __slots__ = ["_solutions_str", "_solutions_by_gate", "errors", "fp", "fn", "size", "optimal", "_classifiers",
+                 "single", "answers", "reduction", "table"]
+
+    def __init__(self, solutions_str, solutions_by_gate, errors, fp, fn, size, optimal=True, classifiers=None,
+                 single=False, answers=None, reduction=None, table=None):
+        self._solutions_str = solutions_str  # solutions as str (None - generated from classifiers)
+        self._solutions_by_gate = solutions_by_gate  # solutions as lists (None - generated from classifiers)
         self.errors = errors  # number of errors in total
         self.fp = fp  # number of FPs
         self.fn = fn  # number of FNs
         self.size = size  # size of classifier (in inputs)
+        self.optimal = optimal  # solutions are proven optimal
+        self._classifiers = classifiers  # solutions as compact classifiers
+        self.single = single  # single solution
+        self.answers = answers  # solutions not encoded yet
+        self.reduction = reduction  # mapping of reduced features of answers
+        self.table = table  # interned names of features
+
+    @property
+    def classifiers(self):
+        if self._classifiers is None and self.answers is not None:
+            # encode answers once, they are not needed anymore
+            if self.table is None:
+                self.table = converter.FeatureTable()
+            if self.single:
+                self._classifiers = converter.encode_answer(self.answers, self.table)
+            else:
+                self._classifiers = [converter.encode_answer(answer, self.table) for answer in self._expanded()]
+            self.answers = None
+            self.reduction = None
+        return self._classifiers
+
+    @classifiers.setter
+    def classifiers(self, value):
+        self._classifiers = value
+
+    @property
+    def solutions_str(self):
+        if self._solutions_str is None and self.classifiers is not None:
+            if self.single:
+                return converter.classifier2str(self.classifiers, self.table)
+            return [converter.classifier2str(classifier, self.table) for classifier in self.classifiers]
+        return self._solutions_str
+
+    @solutions_str.setter
+    def solutions_str(self, value):
+        self._solutions_str = value
+
+    @property
+    def solutions_by_gate(self):
+        if self._solutions_by_gate is None and self.classifiers is not None:
+            if self.single:
+                return converter.classifier2gates(self.classifiers, self.table)
+            return [converter.classifier2gates(classifier, self.table) for classifier in self.classifiers]
+        return self._solutions_by_gate
+
+    @solutions_by_gate.setter
+    def solutions_by_gate(self, value):
+        self._solutions_by_gate = value
+
+    def count(self):
+
+        """
+
+        Returns the number of solutions (without converting them).
+
+        Returns
+        -------
+        int
+            number of solutions
+
+        """
+
+        if self.single:
+            return 1
+        if self.answers is not None:
+            if self.reduction is not None:
+                return sum(self.reduction.expansions(answer) for answer in self.answers)
+            return len(self.answers)
+        if self._classifiers is not None:
+            return len(self._classifiers)
+        return len(self._solutions_str)
+
+    def _expanded(self):
+        if self.reduction is None:
+            return self.answers
+        return self.reduction.expand(self.answers)  # answers are generated one by one
+
+    def split(self):
+
+        """
+
+        Returns a Result for each solution (answers and compact classifiers are shared, not copied).
+
+        Returns
+        -------
+        list
+            list of Results, each containing a single solution
+
+        """
+
+        if self.answers is not None:
+            return [Result(None, None, self.errors, self.fp, self.fn, self.size, self.optimal, single=True,
+                           answers=answer, table=self.table) for answer in self._expanded()]
+
+        if self._classifiers is None:
+            return [Result(solution_str, solution_by_gate, self.errors, self.fp, self.fn, self.size, self.optimal)
+                    for solution_str, solution_by_gate in zip(self.solutions_str, self.solutions_by_gate)]
+
+        return [Result(None, None, self.errors, self.fp, self.fn, self.size, self.optimal, classifier, True,
+                       table=self.table) for classifier in self._classifiers]
+
+
+# class for statuses of solved cells of the relaxation grid
+class FeasibilityFrontier:
+
+    """
+
+    Class representing known satisfiability of cells of the relaxation grid.
+
+    Feasibility is monotone in the bounds on errors: if a cell (fp, fn) is unsatisfiable, every cell (fp', fn')
+    with fp' <= fp and fn' <= fn is unsatisfiable too, and if a cell is satisfiable, every cell with
+    fp' >= fp and fn' >= fn is satisfiable as well. Only the dominating cells are kept.
+
+    Attributes
+    ----------
+    sat : list
+        minimal satisfiable cells
+    unsat : list
+        maximal unsatisfiable cells
+    skipped : int
+        number of cells that were not solved, because their status was implied
+
+    Methods
+    -------
+    record(fp, fn, status)
+        Records status of a solved cell.
+    implied_status(fp, fn)
+        Returns status of a cell implied by recorded cells.
+    skip(fp, fn)
+        Counts a cell that is not solved.
+    """
+
+    def __init__(self):
+        self.sat = []  # minimal satisfiable cells
+        self.unsat = []  # maximal unsatisfiable cells
+        self.skipped = 0  # number of saved solver calls
+
+    def record(self, fp, fn, status):
+
+        """
+
+        Records status of a solved cell. Cells interrupted without any model found are ignored.
+
+        Parameters
+        ----------
+        fp : int
+            number of allowed false positive errors
+        fn : int
+            number of allowed false negative errors
+        status : str
+            status of the solver call
+
+        """
+
+        if status in [solver.SAT, solver.FEASIBLE] and self.implied_status(fp, fn) != solver.SAT:
+            # remove satisfiable cells dominated by the new one
+            self.sat = [(i, j) for i, j in self.sat if not (i >= fp and j >= fn)]
+            self.sat.append((fp, fn))
+
+        elif status == solver.UNSAT and self.implied_status(fp, fn) != solver.UNSAT:
+            # remove unsatisfiable cells dominated by the new one
+            self.unsat = [(i, j) for i, j in self.unsat if not (i <= fp and j <= fn)]
+            self.unsat.append((fp, fn))
+
+    def implied_status(self, fp, fn):
+
+        """
+
+        Returns status of a cell implied by recorded cells.
+
+        Parameters
+        ----------
+        fp : int
+            number of allowed false positive errors
+        fn : int
+            number of allowed false negative errors
+
+        Returns
+        -------
+        str
+            SAT or UNSAT if the status is implied, otherwise None
+
+        """
+
+        if any(fp <= i and fn <= j for i, j in self.unsat):
+            return solver.UNSAT
+        if any(fp >= i and fn >= j for i, j in self.sat):
+            return solver.SAT
+
+        return None
+
+    def skip(self, fp, fn):
+
+        """
+
+        Counts a cell that is not solved, because it is implied to be unsatisfiable.
+
+        Parameters
+        ----------
+        fp : int
+            number of allowed false positive errors
+        fn : int
+            number of allowed false negative errors
+
+        """
+
+        print("Skipping: FP: ", fp, " FN: ", fn, " SUM:", fp + fn, " (implied UNSAT)")
+        self.skipped += 1
+
+
+# class for passing classifiers found for a cell on to a callback
+class ClassifierEmitter:
+
+    """
+
+    Class converting answers found for a cell to classifiers and passing them on to a callback one by one,
+    so they are not collected.
+
+    Attributes
+    ----------
+    fp : int
+        number of allowed false positive errors
+    fn : int
+        number of allowed false negative errors
+    on_classifier : callable
+        callback receiving each classifier as a Result with a single solution
+        (formatted as returned by filter.filter_best_solutions)
+    reduction : FeatureReduction
+        if given, answers are expanded to all equivalent answers
+    optimal : bool
+        False if answers are not proven optimal
+    table : FeatureTable
+        interned names of features shared by the passed on classifiers (see converter.FeatureTable)
+    count : int
+        number of classifiers passed on
+
+    Methods
+    -------
+    __call__(answer)
+        Passes classifiers of an answer on.
+    """
+
+    def __init__(self, fp, fn, on_classifier, reduction=None, optimal=True, table=None):
+        self.fp = fp  # number of FPs
+        self.fn = fn  # number of FNs
+        self.on_classifier = on_classifier  # callback
+        self.reduction = reduction  # mapping of reduced features
+        self.optimal = optimal  # answers are proven optimal
+        self.table = converter.FeatureTable() if table is None else table  # interned names of features
+        self.count = 0  # number of classifiers passed on
+
+    def __call__(self, answer):
+        answers = [answer] if self.reduction is None else self.reduction.expand([answer])
+        for expanded in answers:
+            # encoded when requested, classifiers removed by the callback are never converted
+            self.on_classifier(Result(None, None, self.fp + self.fn, self.fp, self.fn,
+                                      converter.answer_size(expanded), self.optimal, single=True, answers=expanded,
+                                      table=self.table))
+            self.count += 1
+
+
+# create readable result for solutions found for particular bounds on errors
+def create_result(solutions, fp, fn, optimal=True, verbosity=1, reduction=None, table=None):
+
+    """
+
+    Creates a Result for optimal solutions found for particular bounds on errors and converts it to
+    a readable format.
+
+    Parameters
+    ----------
+    solutions : list
+        list of optimal answers (formatted as returned by Clyngor)
+    fp : int
+        number of allowed false positive errors
+    fn : int
+        number of allowed false negative errors
+    optimal : bool
+        False if solutions are not proven optimal
+    verbosity : int
+        0 - no output, 1 - number of solutions, 2 - all solutions as well (see converter.convert_asp_results)
+    reduction : FeatureReduction
+        if given, solutions are found on reduced features and are expanded when the result is split or converted
+    table : FeatureTable
+        interned names of features shared by the results (None - a new table, see converter.FeatureTable)
+
+    Returns
+    -------
+    Result
+        result containing all solutions
+
+    """
+
+    if verbosity >= 1:
+        print("\nSolutions found for: FP: ", fp, " FN: ", fn, " SUM:", fp + fn)
+        if not optimal:
+            print("Solutions are not proven optimal (solver call interrupted).")
+    new_result = Result(solutions, [], fp+fn, fp, fn, 0, optimal, reduction=reduction)  # create new result
+    # convert asp results to string and lists
+    new_result_readable = converter.convert_asp_results([new_result], verbosity, table)[0]
+
+    return new_result_readable
+
+
+# order cells of the relaxation grid
+def relaxation_order(fp_min, fn_min, fp_max, fn_max, search_order="grid"):
+
+    """
+
+    Orders pairs of bounds on false positives and false negatives (cells) visited during the constraints relaxation.
+
+    Parameters
+    ----------
+    fp_min : int
+        number of min allowed false positive errors
+    fn_min : int
+        number of min allowed false negative errors
+    fp_max : int
+        number of max allowed false positive errors
+    fn_max : int
+        number of max allowed false negative errors
+    search_order : str
+        - grid: all cells in a single batch, row by row (by false positives, then false negatives)
+        - diagonal: one batch for each total number of errors (FP+FN) in increasing order,
+          cells in a batch ordered by false positives
+
+    Returns
+    -------
+    batches : list
+        list of batches, each batch is a list of (fp, fn) pairs
+
+    """
+
+    cells = [(i, j) for i in range(fp_min, fp_max+1) for j in range(fn_min, fn_max+1)]
+
+    if search_order == "grid":
+        return [cells]
+    elif search_order == "diagonal":
+        return [[(i, j) for i, j in cells if i + j == errors]
+                for errors in range(fp_min + fn_min, fp_max + fn_max + 1)]
+    else:
+        raise ValueError("Unknown search order: %s" % search_order)
+
+
+# split remaining time of computation among remaining cells
+def cell_time_limit(cell_timeout, deadline, remaining_cells, jobs=1):
+
+    """
+
+    Computes the time limit of the next cell. The time remaining until the deadline is split evenly among
+    the remaining cells (solved by jobs worker processes at the same time), time not used by a cell is
+    split among the following ones.
+
+    Parameters
+    ----------
+    cell_timeout : float
+        max time of solving a single cell in seconds (None - no limit)
+    deadline : float
+        time (as returned by time.time) at which the computation is stopped (None - no limit)
+    remaining_cells : int
+        number of cells that are not solved yet (including the next one)
+    jobs : int
+        number of cells solved at the same time
+
+    Returns
+    -------
+    float
+        time limit of the cell in seconds (None - no limit)
+
+    """
+
+    if deadline is None:
+        return cell_timeout
+
+    remaining = max(0.0, deadline - time.time())
+    share = remaining * min(jobs, remaining_cells) / max(1, remaining_cells)
+
+    return share if cell_timeout is None else min(cell_timeout, share)
+
+
+# show warning and create result for a solved cell
+def collect_outcome(fp, fn, status, solutions, reduction=None, verbosity=1, table=None):
+
+    """
+
+    Shows warnings for a solved cell and creates a Result if solutions were found.
+
+    Parameters
+    ----------
+    fp : int
+        number of allowed false positive errors
+    fn : int
+        number of allowed false negative errors
+    status : str
+        status of the solver call
+    solutions : list
+        list of optimal answers or the best model found (formatted as returned by Clyngor)
+    reduction : FeatureReduction
+        if given, answers found on reduced features are expanded to all equivalent answers
+    verbosity : int
+        0 - no output, 1 - number of solutions, 2 - all solutions as well (see converter.convert_asp_results)
+    table : FeatureTable
+        interned names of features shared by the results (None - a new table, see converter.FeatureTable)
+
+    Returns
+    -------
+    Result
+        result containing all solutions, None if no solutions were found
+
+    """
+
+    if status in [solver.TIMEOUT, solver.FEASIBLE]:
+        print("\nTIME WARNING: FP: ", fp, " FN: ", fn, " interrupted (time limit exceeded).")
+
+    if len(solutions) != 0:  # if solutions were found
+        # note, one result may contain several solutions! solutions with equivalent features are added
+        # when the result is split or converted
+        return create_result(solutions, fp, fn, status != solver.FEASIBLE, verbosity, reduction, table)
+
+    return None
+
+
+# show warning and pass classifiers of a solved cell on
+def stream_outcome(fp, fn, status, solutions, on_classifier, emitter=None, reduction=None, table=None):
+
+    """
+
+    Shows warnings for a solved cell and passes classifiers that were not passed on during solving
+    (see ClassifierEmitter) on to a callback.
+
+    Parameters
+    ----------
+    fp : int
+        number of allowed false positive errors
+    fn : int
+        number of allowed false negative errors
+    status : str
+        status of the solver call
+    solutions : list
+        list of answers that were not passed on yet (formatted as returned by Clyngor)
+    on_classifier : callable
+        callback receiving each classifier
+    emitter : ClassifierEmitter
+        emitter that passed classifiers of the cell on during solving (None - no classifiers were passed on)
+    reduction : FeatureReduction
+        if given, answers found on reduced features are expanded to all equivalent answers
+    table : FeatureTable
+        interned names of features shared by the results (None - a new table, see converter.FeatureTable)
+
+    Returns
+    -------
+    bool
+        True if classifiers were found for the cell
+
+    """
+
+    if status in [solver.TIMEOUT, solver.FEASIBLE]:
+        print("\nTIME WARNING: FP: ", fp, " FN: ", fn, " interrupted (time limit exceeded).")
+
+    remaining = ClassifierEmitter(fp, fn, on_classifier, reduction, status != solver.FEASIBLE, table)
+    for answer in solutions:
+        remaining(answer)
+
+    count = remaining.count + (0 if emitter is None else emitter.count)
+    if count != 0:
+        print("\nClassifiers found for: FP: ", fp, " FN: ", fn, " SUM:", fp + fn, " NUMBER:", count)
+        if status == solver.FEASIBLE:
+            print("Solutions are not proven optimal (solver call interrupted).")
+
+    return count != 0
 
 
 # training classifiers according to asp_program and max values of false positives and false negatives
-def train_classifiers(instance, program, fp_min, fn_min, fp_max, fn_max, max_time, start_train):
+def train_classifiers(instance, program, fp_min, fn_min, fp_max, fn_max, max_time, start_train, incremental=False,
+                      jobs=1, cell_timeout=None, search_order="grid", prune=False, backend="clyngor", data=None,
+                      reduction=None, data_encoding="dense", solver_settings=None, on_classifier=None,
+                      result_cache_dir=None, verbosity=1):
 
     """
     Trains classifiers according to constraints relaxation described in Becker et al. [1]_
@@ -47,8 +546,8 @@ def train_classifiers(instance, program, fp_min, fn_min, fp_max, fn_max, max_tim
 
     Parameters
     ----------
-    instance : str
-        instance, i.e., data and constant constraints
+    instance : str or ProgramFile
+        instance, i.e., data and constant constraints (a file is read by the solver, see solver.ProgramFile)
     program : str
         ASP program, i.e., logic rules
     fp_min : int
@@ -59,6 +558,55 @@ def train_classifiers(instance, program, fp_min, fn_min, fp_max, fn_max, max_tim
         number of max allowed false positive errors
     fn_max : int
         number of max allowed false negative errors
+    max_time : int
+        max time of computation in seconds (None - no limit), the remaining time is split among the remaining
+        cells and enforced during the search (an interrupted cell returns the best model found so far,
+        marked as not optimal)
+    start_train : float
+        start time of training
+    incremental : bool
+        if True ground instance and program once and only change bounds on errors between solver calls
+        (grounded again when a bound is tightened, see solver.IncrementalSolver)
+    jobs : int
+        number of worker processes solving the relaxation grid in parallel (1 - sequential)
+    cell_timeout : float
+        max time of solving a single pair of bounds on errors in seconds (None - no limit, solver.CELL_TIME_LIMIT
+        in worker processes)
+    search_order : str
+        - grid: solve all pairs of bounds on errors row by row
+        - diagonal: solve pairs of bounds on errors by increasing total number of errors and stop after
+          the first total number of errors with solutions (results kept by filter.filter_best_solutions
+          do not change)
+    prune : bool
+        if True record statuses of solved pairs of bounds on errors and do not solve pairs implied to be
+        unsatisfiable (in grid order, pairs are solved from the loosest bounds)
+    backend : str
+        - clyngor: solve ASP text with Clyngor
+        - clingo: solve in-process with the clingo Python API (incremental and parallel solving, and solving
+          with time limits always use it)
+    data : Dataset
+        if given, tissue and miRNA data are added as facts through the clingo backend
+        (instance does not contain them, see classifier.csv2asp)
+    reduction : FeatureReduction
+        if given, the instance contains reduced features (see feature_reducer.reduce_features) and found
+        answers are expanded to all equivalent answers
+    data_encoding : str
+        values of miRNA data added as facts through the clingo backend (see classifier.stored_values)
+    solver_settings : SolverSettings
+        settings of clasp passed to every solver call (None - default settings, see solver.SolverSettings),
+        the time limit of settings is used if cell_timeout is None
+    on_classifier : callable
+        if given, each classifier is passed to it as soon as the solver reports it (as a Result with a single
+        solution tagged with its bounds on errors, see ClassifierEmitter) and classifiers are not collected
+        (returned lists are empty); in worker processes, classifiers of a cell are passed on when the cell
+        is solved
+    result_cache_dir : str
+        directory of the on-disk cache of solver results (None - no cache), cells solved by earlier runs with
+        the same instance, program and options are not solved again (see result_cache.ResultCache); cells
+        whose classifiers were passed on to on_classifier during solving are not stored (even if interrupted)
+    verbosity : int
+        0 - no solutions are shown, 1 - number of solutions found for each cell, 2 - all solutions found for each
+        cell (converting all of them, see converter.convert_asp_results)
 
     Returns
     -------
@@ -84,46 +632,158 @@ def train_classifiers(instance, program, fp_min, fn_min, fp_max, fn_max, max_tim
     returned_results = []
     errors = []
 
-    print("\nProgress...")
+    if solver_settings is None:
+        solver_settings = solver.SolverSettings()
+    opt = solver_settings.options()  # clasp options, all optimal models are returned
+    if cell_timeout is None:
+        cell_timeout = solver_settings.time_limit  # max time of a single solver call
+
     # relax constraints (number of max allowed number of false positives and false negatives)
-    for i in range(fp_min, fp_max+1):  # relax number of false positives
-        for j in range(fn_min, fn_max+1):  # relax number of false negatives
-
-            print("Trying: FP: ", i, " FN: ", j, " SUM:", i + j)
-            # create new constraints
-            constraints = "\n".join(["upper_bound_falsepos(" + str(i) + ").", "upper_bound_falseneg(" + str(j) + ")."])
-            asp_program = instance+constraints+program  # add constraints to the instance and the program
-            opt = '--opt-mode=optN'  # add clasp option - return all optimal models
-            answers = solve(inline=asp_program, options=opt)  # solve program
-
-            #  '--quiet=1' option does not work with clyngor
-            #  answers.with_optimality returns information about optimality of answers
-            solutions = []
-            for answer in answers.with_optimality:
-                if answer[2] is True:  # if solution is optimal
-                    solutions.append(list(answer)[0])  # ad solutions to solution list
-
-            if len(solutions) != 0:  # if solutions were found
-                print("\nSolutions found for: FP: ", i, " FN: ", j, " SUM:", i + j)
-                new_result = Result(solutions, [], i+j, i, j, 0)  # create new result
-                # convert asp results to string and lists
-                new_result_readable = converter.convert_asp_results([new_result])[0]
-                for solution in new_result_readable.solutions_str:
-                    print(solution)
-                returned_results.append(new_result_readable)  # note, one result may contain several solutions!
-                errors.append(i+j)  # add total number of errors to list of errors
+    batches = relaxation_order(fp_min, fn_min, fp_max, fn_max, search_order)
+    print("Search order: ", search_order)
+    print("Solver backend: ", backend)
+    print("Solver options: ", opt)
+
+    parallel = None
+    if jobs > 1:  # solve cells in a pool of worker processes
+        print("Solving in ", jobs, " worker processes...")
+        if cell_timeout is None:  # a single hard cell would block the workers
+            cell_timeout = solver.CELL_TIME_LIMIT
+            print("Max time of a single cell: ", cell_timeout, " seconds (default in worker processes).")
+        parallel = solver.ParallelSolver(instance, program, opt, jobs, data, data_encoding)
+    else:
+        if (cell_timeout is not None or max_time is not None) and not incremental and backend != "clingo":
+            # each cell is solved in a new clingo session interrupted at its time limit
+            print("Time limits require in-process solving, switching to the clingo backend.")
+            backend = "clingo"
+
+        if incremental:  # ground instance and program once in a single solver session
+            print("Grounding instance and program (incremental solving)...")
+            session = solver.IncrementalSolver(instance, program, fp_max, fn_max, opt, data, data_encoding)
+
+    frontier = FeasibilityFrontier() if prune else None
+    table = converter.FeatureTable()  # interned names of features, shared by all results of the run
+
+    cache = None
+    if result_cache_dir is not None:  # results of earlier runs are reused
+        cache = result_cache.ResultCache(result_cache_dir, instance, program, opt, data, data_encoding)
+
+    deadline = None if max_time is None else start_train + max_time  # computation is stopped at the deadline
+    remaining_cells = sum(map(len, batches))  # cells the remaining time is split among
+
+    print("\nProgress...")
+    for batch in batches:
+
+        found = False  # solutions found in the batch
+        time_exceeded = False
+
+        # visit loosest bounds first, so unsatisfiable cells imply as many cells as possible
+        visit = list(reversed(batch)) if prune else batch
+
+        streamed = {}  # emitters of cells whose classifiers were passed on during solving
+
+        if parallel is not None:
+            time_limit = cell_time_limit(cell_timeout, deadline, remaining_cells, jobs)
+            outcomes = {}
+            if cache is not None:
+                for i, j in visit:
+                    cached = cache.get(i, j, time_limit)
+                    if cached is not None:
+                        print("Cached: FP: ", i, " FN: ", j, " SUM:", i + j, " STATUS:", cached[0])
+                        outcomes[(i, j)] = cached
+                        if frontier is not None:
+                            frontier.record(i, j, cached[0])
+
+            solved = parallel.solve_cells([cell for cell in visit if cell not in outcomes], time_limit, deadline,
+                                          frontier)
+            outcomes.update(solved)
+            if cache is not None:
+                for (i, j), (status, solutions) in solved.items():
+                    # cells started late may have had less time than time_limit
+                    cache.put(i, j, status, solutions, time_limit if deadline is None else None)
 
-            # check current time
-            current_time = time.time()
-            elapsed_time = current_time - start_train
-            if elapsed_time >= max_time:
-                print("\nTIME WARNING: Time of computation exceeded ", max_time, " seconds.")
-                break
         else:
-            continue
-        break
+            outcomes = {}
+            for i, j in visit:  # relax number of false positives and false negatives
+
+                if frontier is not None and frontier.implied_status(i, j) == solver.UNSAT:
+                    frontier.skip(i, j)
+                    outcomes[(i, j)] = (solver.UNSAT, [])
+                    continue
+
+                time_limit = cell_time_limit(cell_timeout, deadline, remaining_cells - len(outcomes))
+                if cache is not None:
+                    cached = cache.get(i, j, time_limit)
+                    if cached is not None:  # cell was solved by an earlier run
+                        print("Cached: FP: ", i, " FN: ", j, " SUM:", i + j, " STATUS:", cached[0])
+                        outcomes[(i, j)] = cached
+                        if frontier is not None:
+                            frontier.record(i, j, cached[0])
+                        continue
+
+                print("Trying: FP: ", i, " FN: ", j, " SUM:", i + j)
+                emitter = None
+                if on_classifier is not None:  # pass classifiers on as soon as they are found
+                    emitter = ClassifierEmitter(i, j, on_classifier, reduction, table=table)
+                    streamed[(i, j)] = emitter
+
+                if incremental:
+                    # change bounds on errors and solve grounded program
+                    status, solutions = session.solve(i, j, time_limit, emitter)
+                else:
+                    # create new constraints
+                    constraints = \
+                        "\n".join(["upper_bound_falsepos(" + str(i) + ").", "upper_bound_falseneg(" + str(j) + ")."])
+                    asp_program = [instance, constraints, program]  # parts are not concatenated for each cell
+                    status, solutions = solver.solve_program(asp_program, opt, backend, data, data_encoding,
+                                                             time_limit, emitter)  # solve program
+
+                outcomes[(i, j)] = (status, solutions)
+                if frontier is not None:
+                    frontier.record(i, j, status)
+                if cache is not None and not (emitter is not None and emitter.count != 0):
+                    # passed on solutions are not collected, also if the cell was interrupted afterwards
+                    cache.put(i, j, status, solutions, time_limit)
+
+                # check current time
+                if deadline is not None and time.time() >= deadline:
+                    time_exceeded = True
+                    break
+
+        # merge results in the order of the relaxation
+        for i, j in batch:
+            if (i, j) not in outcomes:  # cell was not solved in time
+                time_exceeded = True
+                continue
+            status, solutions = outcomes[(i, j)]
+            if on_classifier is not None:
+                if stream_outcome(i, j, status, solutions, on_classifier, streamed.get((i, j)), reduction, table):
+                    found = True
+                continue
+            new_result = collect_outcome(i, j, status, solutions, reduction, verbosity, table)
+            if new_result is not None:
+                returned_results.append(new_result)
+                errors.append(i+j)  # add total number of errors to list of errors
+                found = True
+
+        if time_exceeded:
+            print("\nTIME WARNING: Time of computation exceeded ", max_time, " seconds.")
+            break
+
+        remaining_cells -= len(batch)
+
+        if search_order == "diagonal" and found:  # all remaining cells allow more errors in total
+            print("\nSolutions found for SUM: ", batch[0][0] + batch[0][1], ", skipping remaining cells.")
+            break
+
+    if parallel is not None:
+        parallel.close()
 
     print("\nCollecting answers finished.")
+    if frontier is not None:
+        print("Solver calls saved by pruning: ", frontier.skipped)
+    if cache is not None:
+        print("Solver calls saved by result cache: ", cache.hits)
 
     # if no solutions were found
     if len(returned_results) == 0: